@@ -0,0 +1,212 @@
+"""Check the aggregation functions against a local Postgres and measure the data saved per read.
+
+Applies migrations/*.sql to a scratch schema, seeds a week of synthetic btc_price and
+eco_info rows, compares every SQL function with the same aggregation done in Python
+over the raw rows, and reports rows/bytes/time for raw reads versus the RPC result.
+
+    LOCAL_PG_DSN=postgresql://postgres@localhost:5432/postgres python benchmarks/bench_db_aggregates.py
+
+Requires psycopg (pip install "psycopg[binary]").
+"""
+import os
+import sys
+import glob
+import json
+import math
+import time
+import random
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+
+import psycopg
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from news_ranking import NewsRanker, MACRO_TERMS, CRYPTO_TERMS  # noqa: E402
+
+SCHEMA = f"agg_harness_{os.getpid()}"
+RANKER = NewsRanker()
+
+NEWS_TEMPLATES = [
+    "Bitcoin ETF inflows reach ${n} million as BTC holds above support",
+    "Fed officials signal rates will stay higher for longer, item {n}",
+    "CPI inflation data surprises economists in report {n}",
+    "Crypto markets rally as stablecoin supply grows, update {n}",
+    "Retail sales and consumer sentiment update number {n}",
+    "Treasury yields climb after strong payrolls report {n}",
+    "Fed rate decision hits bitcoin, story {n}",
+    "SEC weighs <b>ETF</b> outflows as miners sell, item {n}",
+    "Federal Reserve minutes and the dollar move stocks, note {n}",
+]
+
+
+def python_topic(text: str) -> str:
+    """The topic NewsRanker assigns, which news_topic() must reproduce"""
+    return RANKER.score(text, 0.0, 0.0)[1]
+
+
+def seed(cur, now: datetime, price_rows: int, news_rows: int):
+    random.seed(7)
+    price = 95000.0
+    prices = []
+    start = now - timedelta(minutes=price_rows)
+    for i in range(price_rows):
+        price *= 1 + random.gauss(0, 0.0008)
+        prices.append((start + timedelta(minutes=i), price))
+    with cur.copy("COPY btc_price (timestamp, price) FROM STDIN") as copy:
+        for row in prices:
+            copy.write_row(row)
+
+    news = []
+    news_start = now - timedelta(days=7)
+    for i in range(news_rows):
+        text = random.choice(NEWS_TEMPLATES).format(n=i)
+        news.append((news_start + timedelta(seconds=random.randint(0, 7 * 86400)), text))
+    with cur.copy("COPY eco_info (timestamp, finance_info) FROM STDIN") as copy:
+        for row in news:
+            copy.write_row(row)
+
+
+def timed(cur, sql: str, params=()):
+    started = time.perf_counter()
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    elapsed = (time.perf_counter() - started) * 1000
+    columns = [column.name for column in cur.description]
+    payload = json.dumps([dict(zip(columns, row)) for row in rows], default=str)
+    return rows, elapsed, len(payload)
+
+
+def close(a, b, tolerance=1e-6) -> bool:
+    if a is None or b is None:
+        return a is b
+    return math.isclose(a, b, rel_tol=tolerance, abs_tol=tolerance)
+
+
+def main():
+    dsn = os.getenv('LOCAL_PG_DSN', 'postgresql://postgres@localhost:5432/postgres')
+    price_rows = int(os.getenv('HARNESS_PRICE_ROWS', str(7 * 24 * 60)))
+    news_rows = int(os.getenv('HARNESS_NEWS_ROWS', '2000'))
+    failures = []
+    report = []
+
+    with psycopg.connect(dsn, autocommit=True) as conn, conn.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(f"SET search_path TO {SCHEMA}, public")
+        cur.execute("SET TIME ZONE 'UTC'")
+        try:
+            cur.execute("""
+                CREATE TABLE btc_price (
+                    id bigserial PRIMARY KEY,
+                    timestamp timestamptz NOT NULL DEFAULT now(),
+                    price double precision NOT NULL
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE eco_info (
+                    id bigserial PRIMARY KEY,
+                    timestamp timestamptz NOT NULL DEFAULT now(),
+                    finance_info text
+                )
+            """)
+            for path in sorted(glob.glob(os.path.join(ROOT, 'migrations', '*.sql'))):
+                with open(path) as f:
+                    cur.execute(f.read())
+
+            now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+            seed(cur, now, price_rows, news_rows)
+            cur.execute("ANALYZE")
+
+            # news_topic() against the ranker: every term, every macro/crypto pair and the templates
+            texts = list(MACRO_TERMS) + list(CRYPTO_TERMS) + [t.format(n=0) for t in NEWS_TEMPLATES]
+            texts += [f"{macro} {crypto}" for macro in MACRO_TERMS for crypto in CRYPTO_TERMS]
+            cur.execute("SELECT text, news_topic(text) FROM unnest(%s::text[]) AS text", (texts,))
+            for text, topic in cur.fetchall():
+                if topic != python_topic(text):
+                    failures.append(f"news_topic({text!r}) = {topic}, ranker says {python_topic(text)}")
+
+            # Hourly bars over the last 24 hours
+            since = now - timedelta(hours=24)
+            raw, raw_ms, raw_bytes = timed(cur, "SELECT id, timestamp, price FROM btc_price WHERE timestamp >= %s ORDER BY timestamp", (since,))
+            bars, rpc_ms, rpc_bytes = timed(cur, "SELECT * FROM btc_hourly_bars(%s)", (since,))
+            expected = defaultdict(list)
+            for _, ts, price in raw:
+                expected[ts.replace(minute=0, second=0, microsecond=0)].append(price)
+            if len(bars) != len(expected):
+                failures.append(f"btc_hourly_bars: {len(bars)} bars, expected {len(expected)}")
+            for hour, open_, high, low, close_, average, samples in bars:
+                values = expected[hour]
+                if not (close(open_, values[0]) and close(close_, values[-1]) and close(high, max(values))
+                        and close(low, min(values)) and close(average, sum(values) / len(values)) and samples == len(values)):
+                    failures.append(f"btc_hourly_bars: mismatch at {hour}")
+            report.append(('btc_hourly_bars (24h)', len(raw), raw_bytes, raw_ms, len(bars), rpc_bytes, rpc_ms))
+
+            # Daily averages over the last 7 days
+            day_start = now.replace(hour=0, minute=0) - timedelta(days=6)
+            raw, raw_ms, raw_bytes = timed(cur, "SELECT id, timestamp, price FROM btc_price WHERE timestamp >= %s ORDER BY timestamp", (day_start,))
+            days, rpc_ms, rpc_bytes = timed(cur, "SELECT * FROM btc_daily_averages(7)")
+            expected = defaultdict(list)
+            for _, ts, price in raw:
+                expected[ts.date()].append(price)
+            for day, average, high, low, samples in days:
+                values = expected[day]
+                if not (close(average, sum(values) / len(values)) and close(high, max(values)) and close(low, min(values)) and samples == len(values)):
+                    failures.append(f"btc_daily_averages: mismatch on {day}")
+            if len(days) != len(expected):
+                failures.append(f"btc_daily_averages: {len(days)} days, expected {len(expected)}")
+            report.append(('btc_daily_averages (7d)', len(raw), raw_bytes, raw_ms, len(days), rpc_bytes, rpc_ms))
+
+            # Change since yesterday
+            raw, raw_ms, raw_bytes = timed(cur, "SELECT id, timestamp, price FROM btc_price WHERE timestamp >= %s ORDER BY timestamp", (now - timedelta(hours=25),))
+            change, rpc_ms, rpc_bytes = timed(cur, "SELECT * FROM btc_change_since_yesterday()")
+            latest_ts, latest_price = raw[-1][1], raw[-1][2]
+            before = [row for row in raw if row[1] <= latest_ts - timedelta(hours=24)]
+            yesterday_price = before[-1][2]
+            if not change or not (close(change[0][0], latest_price) and close(change[0][2], yesterday_price)
+                                  and close(change[0][5], (latest_price - yesterday_price) / yesterday_price * 100)):
+                failures.append("btc_change_since_yesterday: mismatch")
+            report.append(('btc_change_since_yesterday', len(raw), raw_bytes, raw_ms, len(change), rpc_bytes, rpc_ms))
+
+            # Latest news per topic
+            raw, raw_ms, raw_bytes = timed(cur, "SELECT id, timestamp, finance_info FROM eco_info ORDER BY timestamp DESC, id DESC")
+            latest, rpc_ms, rpc_bytes = timed(cur, "SELECT * FROM latest_news_per_topic(3)")
+            expected = defaultdict(list)
+            for news_id, _, text in raw:
+                topic = python_topic(text)
+                if len(expected[topic]) < 3:
+                    expected[topic].append(news_id)
+            actual = defaultdict(list)
+            for topic, news_id, _, _ in latest:
+                actual[topic].append(news_id)
+            if dict(actual) != dict(expected):
+                failures.append(f"latest_news_per_topic: {dict(actual)} != {dict(expected)}")
+            report.append(('latest_news_per_topic (3)', len(raw), raw_bytes, raw_ms, len(latest), rpc_bytes, rpc_ms))
+
+            # News counts per topic per day
+            since = now - timedelta(days=7)
+            raw, raw_ms, raw_bytes = timed(cur, "SELECT id, timestamp, finance_info FROM eco_info WHERE timestamp >= %s", (since,))
+            counts, rpc_ms, rpc_bytes = timed(cur, "SELECT * FROM news_counts_per_topic(%s)", (since,))
+            expected = defaultdict(int)
+            for _, ts, text in raw:
+                expected[(ts.date(), python_topic(text))] += 1
+            if {(day, topic): items for day, topic, items in counts} != dict(expected):
+                failures.append("news_counts_per_topic: mismatch")
+            report.append(('news_counts_per_topic (7d)', len(raw), raw_bytes, raw_ms, len(counts), rpc_bytes, rpc_ms))
+        finally:
+            cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+
+    print(f"{'query':<28} {'raw rows':>9} {'raw KB':>9} {'raw ms':>8} {'rpc rows':>9} {'rpc KB':>8} {'rpc ms':>8}")
+    for name, raw_rows, raw_bytes, raw_ms, rpc_rows, rpc_bytes, rpc_ms in report:
+        print(f"{name:<28} {raw_rows:>9} {raw_bytes / 1024:>9.1f} {raw_ms:>8.1f} {rpc_rows:>9} {rpc_bytes / 1024:>8.1f} {rpc_ms:>8.1f}")
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll aggregation functions match the client-side results.")
+
+
+if __name__ == "__main__":
+    main()
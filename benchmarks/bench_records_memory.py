@@ -0,0 +1,135 @@
+"""Peak memory of the email agent's data path for large windows, raw dicts vs records.
+
+The payloads are written by one subprocess and each mode is measured in its own fresh
+subprocess, so no measured process inherits the memory used to build the payloads.
+Each mode reports its peak RSS growth and, in a separate run, its tracemalloc peak:
+
+    python benchmarks/bench_records_memory.py --rows 100000
+"""
+import os
+import sys
+import csv
+import json
+import random
+import argparse
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def write_payloads(rows: int, payload_dir: str):
+    """Bodies shaped like the eco_info and btc_price REST responses, as JSON and as CSV"""
+    random.seed(42)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    news = [{
+        'id': i,
+        'timestamp': (start + timedelta(minutes=i)).isoformat(),
+        'finance_info': f"Story {i}: markets react as bitcoin trades near ${random.uniform(40000, 110000):,.2f} "
+                        f"while investors weigh the latest inflation data and central bank guidance."
+    } for i in range(rows)]
+    prices = [{
+        'price': random.uniform(40000, 110000),
+        'timestamp': (start + timedelta(minutes=i)).isoformat()
+    } for i in range(rows)]
+
+    for name, table, columns in (('news', news, ['id', 'timestamp', 'finance_info']), ('prices', prices, ['price', 'timestamp'])):
+        with open(os.path.join(payload_dir, f'{name}.json'), 'w') as f:
+            json.dump(table, f)
+        with open(os.path.join(payload_dir, f'{name}.csv'), 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(table)
+
+
+def peak_rss_mb() -> float:
+    # VmHWM belongs to this process image; ru_maxrss on Linux also carries the pre-exec parent's peak
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_dicts(news_body: str, prices_body: str):
+    """The original path: keep raw dicts, copy into prompt lists, print everything"""
+    news_data = json.loads(news_body)
+    prices_data_raw = json.loads(prices_body)
+    with open(os.devnull, 'w') as devnull:
+        print("News data:", news_data, file=devnull)
+        print("Price data:", prices_data_raw, file=devnull)
+    news_items = [item['finance_info'] for item in news_data]
+    prices_data = [{'price': item['price'], 'timestamp': item['timestamp']} for item in prices_data_raw]
+    prompt = f"{json.dumps(prices_data)}\n{json.dumps(news_items)}"
+    return len(prompt)
+
+
+def run_records(news_body: str, prices_body: str):
+    """The records path: CSV bodies parsed row by row into slotted records and price arrays"""
+    from records import parse_news_csv, PriceSeries
+    news = parse_news_csv(news_body)
+    prices = PriceSeries.from_csv(prices_body)
+    news_items = [record.finance_info for record in news]
+    prompt = f"{json.dumps(prices.to_prompt())}\n{json.dumps(news_items)}"
+    return len(prompt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--mode', choices=['dicts', 'records'])
+    parser.add_argument('--payload-dir')
+    parser.add_argument('--write-payloads', action='store_true')
+    parser.add_argument('--tracemalloc', action='store_true')
+    args = parser.parse_args()
+
+    if args.write_payloads:
+        write_payloads(args.rows, args.payload_dir)
+        return
+
+    if args.mode:
+        # The agent fetches JSON for the dict path and CSV for the records path
+        extension = 'json' if args.mode == 'dicts' else 'csv'
+        with open(os.path.join(args.payload_dir, f'news.{extension}')) as f:
+            news_body = f.read()
+        with open(os.path.join(args.payload_dir, f'prices.{extension}')) as f:
+            prices_body = f.read()
+        runner = run_dicts if args.mode == 'dicts' else run_records
+        if args.tracemalloc:
+            tracemalloc.start()
+            runner(news_body, prices_body)
+            print(json.dumps({'tracemalloc_peak_mb': tracemalloc.get_traced_memory()[1] / (1024 * 1024)}))
+        else:
+            baseline = peak_rss_mb()
+            runner(news_body, prices_body)
+            print(json.dumps({'baseline_mb': baseline, 'peak_mb': peak_rss_mb()}))
+        return
+
+    def child(*extra):
+        output = subprocess.run([sys.executable, __file__, '--rows', str(args.rows), '--payload-dir', payload_dir, *extra],
+                                capture_output=True, text=True, check=True).stdout
+        return json.loads(output.strip().splitlines()[-1]) if output.strip() else {}
+
+    results = {}
+    with tempfile.TemporaryDirectory() as payload_dir:
+        child('--write-payloads')
+        for mode in ('dicts', 'records'):
+            results[mode] = {**child('--mode', mode), **child('--mode', mode, '--tracemalloc')}
+
+    print(f"{args.rows:,} rows per table")
+    for mode, result in results.items():
+        print(f"{mode:>8}: RSS {result['baseline_mb']:.1f} -> {result['peak_mb']:.1f} MB "
+              f"(+{result['peak_mb'] - result['baseline_mb']:.1f} MB), "
+              f"tracemalloc peak {result['tracemalloc_peak_mb']:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,35 @@
-import requests
-from supabase import create_client
 from datetime import datetime, timezone
-from dotenv import load_dotenv
-import os
 import json
+import time
+import argparse
+from price_alerts import PriceAlertEngine, MailgunAlertNotifier
+from write_ahead_log import WriteAheadLog
+from btc_scheduler import AdaptiveScheduler
+from config import get_settings
+from clients import get_supabase, get_http_session
+from profiling import profile_run
+from records import to_epoch
 
 class BTCAgent:
-    def __init__(self):
-        # Load environment variables
-        load_dotenv(override=True)
-        
-        # Initialize Supabase client
-        self.supabase_url = os.getenv("SUPABASE_URL")
-        self.supabase_key = os.getenv("SUPABASE_KEY")
-        
-        if not self.supabase_url or not self.supabase_key:
-            raise ValueError("Supabase credentials not found in environment variables")
-            
-        self.supabase = create_client(self.supabase_url, self.supabase_key)
-        self.supabase.debug = False
+    def __init__(self, alert_engine: PriceAlertEngine = None):
+        self.settings = get_settings().require('supabase_url', 'supabase_key')
+        self.supabase = get_supabase()
+        self.http = get_http_session('coingecko')
+
+        # Inserts go through the local write-ahead log and are flushed in the background,
+        # on a client with a short timeout so shutdown never waits out a hung request
+        wal_client = get_supabase(request_timeout=self.settings.wal_request_timeout)
+        self.wal = WriteAheadLog(wal_client, path=self.settings.wal_path).start()
+
+        # Optional alert engine evaluated on every new sample
+        self.alert_engine = alert_engine
 
     def test_supabase_connection(self):
         """Test the Supabase connection"""
         print("Testing basic Supabase connection...")
         try:
-            response = self.supabase.table('btc_price').select('*').execute()
+            # A single-row probe is enough; full scans go through supabase_reader
+            self.supabase.table('btc_price').select('id').limit(1).execute()
             return True
         except Exception as e:
             print(f"Error during Supabase SELECT test: {type(e).__name__} - {str(e)}")
@@ -35,7 +40,7 @@ class BTCAgent:
         print("Fetching Bitcoin price from CoinGecko...")
         try:
             url = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=usd"
-            response = requests.get(url)
+            response = self.http.get(url, timeout=30)
             response.raise_for_status()
             
             data = response.json()
@@ -48,7 +53,7 @@ class BTCAgent:
             return None
 
     def store_price(self, btc_price: float):
-        """Store Bitcoin price in Supabase"""
+        """Queue Bitcoin price for Supabase through the write-ahead log"""
         if btc_price is None:
             return False
             
@@ -59,22 +64,17 @@ class BTCAgent:
         print("Payload:", json.dumps(payload, indent=4))
         
         try:
-            print("Attempting to insert data into Supabase...")
-            result = self.supabase.table('btc_price').insert(payload).execute()
-            print("Supabase Insert Response:", result)
+            key = self.wal.append('btc_price', payload)
+            print(f"Queued price for Supabase (idempotency key {key})")
             return True
         except Exception as e:
-            print(f"Supabase Insert Error: {type(e).__name__} - {str(e)}")
+            print(f"Write-ahead log error: {type(e).__name__} - {str(e)}")
             return False
 
     def get_btc_price(self):
         """Main method to fetch and store Bitcoin price"""
         try:
-            # Test Supabase connection
-            if not self.test_supabase_connection():
-                raise Exception("Failed to connect to Supabase")
-                
-            # Fetch BTC price
+            # Fetch BTC price (Supabase is not contacted here; the write-ahead log delivers it)
             btc_price = self.fetch_btc_price()
             if btc_price is None:
                 raise Exception("Failed to fetch BTC price")
@@ -83,6 +83,9 @@ class BTCAgent:
             if not self.store_price(btc_price):
                 raise Exception("Failed to store BTC price")
                 
+            if self.alert_engine:
+                self.alert_engine.update(btc_price)
+
             print(f"Final Bitcoin price: ${btc_price:,.2f} USD")
             return btc_price
             
@@ -90,9 +93,72 @@ class BTCAgent:
             print(f"Error in get_btc_price: {type(e).__name__} - {str(e)}")
             return None
 
+    def seed_alert_engine(self):
+        """Warm the alert engine windows with the most recent stored prices"""
+        if not self.alert_engine:
+            return
+        try:
+            response = self.supabase.table('btc_price') \
+                .select('price, timestamp') \
+                .order('timestamp', desc=True) \
+                .limit(self.alert_engine.returns.size + 1) \
+                .execute()
+            self.alert_engine.seed((row['price'], to_epoch(row['timestamp'])) for row in reversed(response.data))
+            print(f"Seeded alert engine with {len(response.data)} prices")
+        except Exception as e:
+            print(f"Error seeding alert engine: {type(e).__name__} - {str(e)}")
+
+    def collect(self, interval_seconds: float = 60, iterations: int = None, scheduler: AdaptiveScheduler = None):
+        """Fetch and store prices in a loop, evaluating alerts on each sample.
+
+        With a scheduler the interval adapts to recent volatility instead of staying fixed.
+        """
+        self.seed_alert_engine()
+        count = 0
+        while iterations is None or count < iterations:
+            if scheduler:
+                scheduler.record_request()
+            btc_price = self.get_btc_price()
+            count += 1
+
+            wait = interval_seconds
+            if scheduler:
+                wait = scheduler.observe(btc_price)
+                print("Sampling metrics:", json.dumps(scheduler.metrics()))
+            if iterations is None or count < iterations:
+                time.sleep(wait)
+
 def main():
-    agent = BTCAgent()
-    agent.get_btc_price()
+    parser = argparse.ArgumentParser(description="Fetch and store the Bitcoin price")
+    parser.add_argument('--watch', action='store_true', help="Keep collecting prices and evaluate price alerts")
+    parser.add_argument('--interval', type=float, default=60, help="Seconds between samples in watch mode")
+    parser.add_argument('--adaptive', action='store_true', help="Adapt the watch interval to market volatility")
+    parser.add_argument('--min-interval', type=float, default=15, help="Fastest adaptive interval in seconds")
+    parser.add_argument('--max-interval', type=float, default=300, help="Slowest adaptive interval in seconds")
+    parser.add_argument('--calls-per-minute', type=float, default=10, help="CoinGecko request budget for adaptive mode")
+    parser.add_argument('--profile', action='store_true', help="Write a flame graph and timing/allocation report to profiles/")
+    args = parser.parse_args()
+
+    with profile_run('btc_agent', args.profile):
+        if args.watch:
+            agent = BTCAgent(alert_engine=PriceAlertEngine(notifier=MailgunAlertNotifier()))
+        else:
+            agent = BTCAgent()
+        try:
+            if args.watch:
+                scheduler = None
+                if args.adaptive:
+                    scheduler = AdaptiveScheduler(
+                        min_interval=args.min_interval,
+                        max_interval=args.max_interval,
+                        initial_interval=args.interval,
+                        calls_per_minute=args.calls_per_minute
+                    )
+                agent.collect(interval_seconds=args.interval, scheduler=scheduler)
+            else:
+                agent.get_btc_price()
+        finally:
+            agent.wal.close()
 
 if __name__ == "__main__":
     main()
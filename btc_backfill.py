@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import argparse
+import requests
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone, timedelta
+from config import get_settings
+from clients import get_supabase, get_http_session
+from supabase_reader import iter_rows
+from records import to_epoch, to_iso
+from rate_limit import RateLimiter
+
+
+COINGECKO_RANGE_URL = "https://api.coingecko.com/api/v3/coins/bitcoin/market_chart/range"
+
+
+def retry_after(header: str, default: float) -> float:
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date), else default"""
+    if not header:
+        return default
+    try:
+        return max(float(header), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(header) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class BTCBackfill:
+    def __init__(self,
+                 workers: int = 4,
+                 calls_per_minute: float = 25,
+                 chunk_days: int = 90,
+                 batch_size: int = 1000,
+                 checkpoint_path: str = '.btc_backfill_checkpoint.json'):
+        self.settings = get_settings().require('supabase_url', 'supabase_key')
+        self.supabase = get_supabase()
+
+        # Optional CoinGecko demo key raises the public rate limit
+        self.coingecko_key = self.settings.coingecko_api_key
+
+        self.workers = workers
+        self.rate_limiter = RateLimiter.per_minute(calls_per_minute)
+        # CoinGecko returns hourly points for ranges up to 90 days
+        self.chunk_days = chunk_days
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.session = get_http_session('coingecko', pool_maxsize=workers)
+
+    def load_checkpoint(self) -> set:
+        """Return the set of chunk keys already written"""
+        try:
+            with open(self.checkpoint_path) as f:
+                return set(json.load(f).get('completed', []))
+        except FileNotFoundError:
+            return set()
+
+    def save_checkpoint(self, completed: set):
+        # Write to a temp file first so an interrupted run never corrupts the checkpoint
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'completed': sorted(completed)}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def build_chunks(self, start: datetime, end: datetime) -> list:
+        """Split [start, end) into chunk_days sized windows"""
+        chunks = []
+        cursor = start
+        step = timedelta(days=self.chunk_days)
+        while cursor < end:
+            chunk_end = min(cursor + step, end)
+            chunks.append((cursor, chunk_end))
+            cursor = chunk_end
+        return chunks
+
+    def fetch_chunk(self, start: datetime, end: datetime, retries: int = 5) -> list:
+        """Fetch [timestamp_ms, price] points for one chunk from CoinGecko"""
+        params = {
+            'vs_currency': 'usd',
+            'from': int(start.timestamp()),
+            'to': int(end.timestamp())
+        }
+        headers = {'x-cg-demo-api-key': self.coingecko_key} if self.coingecko_key else {}
+
+        for attempt in range(retries):
+            self.rate_limiter.wait()
+            backoff = 2 ** attempt * 5
+            try:
+                response = self.session.get(COINGECKO_RANGE_URL, params=params, headers=headers, timeout=30)
+            except requests.RequestException as e:
+                # Connection errors and timeouts are transient; retry with the same backoff
+                print(f"CoinGecko request failed for {start.date()} ({type(e).__name__}), retrying in {backoff:.0f}s")
+                time.sleep(backoff)
+                continue
+            if response.status_code == 429 or response.status_code >= 500:
+                # Back off on throttling or server errors, honouring Retry-After when present
+                delay = retry_after(response.headers.get('Retry-After'), backoff)
+                print(f"CoinGecko returned {response.status_code} for {start.date()}, retrying in {delay:.0f}s")
+                time.sleep(delay)
+                continue
+            response.raise_for_status()
+            return response.json().get('prices', [])
+
+        raise Exception(f"CoinGecko range request failed after {retries} attempts for {start.date()} - {end.date()}")
+
+    def existing_timestamps(self, start: datetime, end: datetime) -> set:
+        """Return epoch ms of btc_price rows already stored in [start, end)"""
+        rows = iter_rows(
+            self.supabase, 'btc_price',
+            columns='timestamp',
+            start=start,
+            end=end
+        )
+        return {round(to_epoch(row['timestamp']) * 1000) for row in rows}
+
+    def normalize(self, points: list, start: datetime, end: datetime, existing: set) -> list:
+        """Map CoinGecko points to btc_price rows, skipping stored and out-of-range timestamps"""
+        start_ms = int(start.timestamp() * 1000)
+        end_ms = int(end.timestamp() * 1000)
+        rows = []
+        seen = set(existing)
+        for epoch_ms, price in points:
+            epoch_ms = int(epoch_ms)
+            if epoch_ms < start_ms or epoch_ms >= end_ms or epoch_ms in seen or price is None:
+                continue
+            seen.add(epoch_ms)
+            rows.append({'price': price, 'timestamp': to_iso(epoch_ms / 1000)})
+        return rows
+
+    def write_rows(self, rows: list) -> int:
+        """Insert rows in batches of batch_size"""
+        for i in range(0, len(rows), self.batch_size):
+            self.supabase.table('btc_price').insert(rows[i:i + self.batch_size]).execute()
+        return len(rows)
+
+    def load_chunk(self, start: datetime, end: datetime) -> list:
+        """Fetch and normalize one chunk (runs on a worker thread)"""
+        points = self.fetch_chunk(start, end)
+        existing = self.existing_timestamps(start, end)
+        return self.normalize(points, start, end, existing)
+
+    def run(self, start: datetime, end: datetime) -> int:
+        """Backfill btc_price between start and end, resuming from the checkpoint"""
+        completed = self.load_checkpoint()
+        chunks = [chunk for chunk in self.build_chunks(start, end)
+                  if f"{chunk[0].isoformat()}/{chunk[1].isoformat()}" not in completed]
+        print(f"Backfilling {len(chunks)} chunks from {start.date()} to {end.date()} "
+              f"({len(completed)} already completed)")
+
+        inserted = 0
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.load_chunk, *chunk): chunk for chunk in chunks}
+            # Writes happen on the main thread so batches and checkpoints stay ordered per chunk
+            for future in as_completed(futures):
+                chunk_start, chunk_end = futures[future]
+                try:
+                    rows = future.result()
+                    inserted += self.write_rows(rows)
+                    completed.add(f"{chunk_start.isoformat()}/{chunk_end.isoformat()}")
+                    self.save_checkpoint(completed)
+                    print(f"Chunk {chunk_start.date()} - {chunk_end.date()}: inserted {len(rows)} rows")
+                except Exception as e:
+                    print(f"Error backfilling chunk {chunk_start.date()} - {chunk_end.date()}: "
+                          f"{type(e).__name__} - {str(e)}")
+
+        print(f"Backfill inserted {inserted} rows in {time.monotonic() - started:.1f}s")
+        return inserted
+
+
+def parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill historical BTC prices from CoinGecko into btc_price")
+    parser.add_argument('--start', type=parse_date, required=True, help="Start date (YYYY-MM-DD, UTC)")
+    parser.add_argument('--end', type=parse_date, default=None, help="End date (YYYY-MM-DD, UTC), defaults to now")
+    parser.add_argument('--workers', type=int, default=4, help="Parallel CoinGecko requests")
+    parser.add_argument('--calls-per-minute', type=float, default=25, help="CoinGecko request budget")
+    parser.add_argument('--chunk-days', type=int, default=90, help="Days per CoinGecko request")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Rows per Supabase insert")
+    parser.add_argument('--checkpoint', default='.btc_backfill_checkpoint.json', help="Checkpoint file for resuming")
+    args = parser.parse_args()
+
+    backfill = BTCBackfill(
+        workers=args.workers,
+        calls_per_minute=args.calls_per_minute,
+        chunk_days=args.chunk_days,
+        batch_size=args.batch_size,
+        checkpoint_path=args.checkpoint
+    )
+    backfill.run(args.start, args.end or datetime.now(timezone.utc))
+
+
+if __name__ == "__main__":
+    main()
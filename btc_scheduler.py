@@ -0,0 +1,101 @@
+import math
+import time
+from collections import deque
+from price_alerts import RollingStats
+
+
+class AdaptiveScheduler:
+    """Choose the next BTC polling interval from recent volatility within a request budget"""
+
+    def __init__(self,
+                 min_interval: float = 15,
+                 max_interval: float = 300,
+                 initial_interval: float = 60,
+                 calls_per_minute: float = 10,
+                 window: int = 10,
+                 fast_volatility_pct: float = 0.15,
+                 calm_volatility_pct: float = 0.03,
+                 fast_move_pct: float = 0.5,
+                 shrink_factor: float = 0.5,
+                 grow_factor: float = 1.25):
+        # Volatility and move thresholds are per-minute percentages (moves are sqrt-time scaled)
+        # so they do not depend on the current interval
+        self.max_interval = max_interval
+        self.calls_per_minute = calls_per_minute
+        # Never poll faster than the provider budget allows on average
+        self.min_interval = max(min_interval, 60.0 / calls_per_minute)
+        self.interval = min(max(initial_interval, self.min_interval), max_interval)
+        self.returns = RollingStats(window)
+        self.fast_volatility_pct = fast_volatility_pct
+        self.calm_volatility_pct = calm_volatility_pct
+        self.fast_move_pct = fast_move_pct
+        self.shrink_factor = shrink_factor
+        self.grow_factor = grow_factor
+
+        self.request_times = deque()
+        self.total_requests = 0
+        self.last_price = None
+        self.last_sample_time = None
+        self.last_move_pct = 0.0
+
+    def record_request(self, now: float = None):
+        """Count one provider request against the rolling one-minute budget"""
+        now = time.monotonic() if now is None else now
+        self.request_times.append(now)
+        self.total_requests += 1
+        self._expire(now)
+
+    def _expire(self, now: float):
+        while self.request_times and now - self.request_times[0] >= 60:
+            self.request_times.popleft()
+
+    def volatility_pct(self) -> float:
+        """Realized volatility of per-minute-normalized returns, in percent"""
+        return self.returns.std() * 100
+
+    def observe(self, price: float, now: float = None) -> float:
+        """Feed a new price and return the interval to wait before the next poll"""
+        now = time.monotonic() if now is None else now
+        if price is not None and self.last_price:
+            minutes = max((now - self.last_sample_time) / 60, 1e-6)
+            change = (price - self.last_price) / self.last_price
+            # Scale to a one-minute horizon (random-walk sqrt-time scaling)
+            scaled = change / math.sqrt(minutes)
+            self.returns.push(scaled)
+            self.last_move_pct = scaled * 100
+
+            volatility = self.volatility_pct()
+            if volatility >= self.fast_volatility_pct or abs(self.last_move_pct) >= self.fast_move_pct:
+                self.interval = max(self.interval * self.shrink_factor, self.min_interval)
+            elif len(self.returns) >= 2 and volatility <= self.calm_volatility_pct:
+                self.interval = min(self.interval * self.grow_factor, self.max_interval)
+
+        if price is not None:
+            self.last_price = price
+            self.last_sample_time = now
+        return self.wait_time(now)
+
+    def wait_time(self, now: float = None) -> float:
+        """Current interval, stretched if the last minute's requests already hit the budget"""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        wait = self.interval
+        if len(self.request_times) >= self.calls_per_minute:
+            wait = max(wait, 60 - (now - self.request_times[0]))
+        return wait
+
+    def metrics(self, now: float = None) -> dict:
+        now = time.monotonic() if now is None else now
+        # The sampling rate follows the actual wait, which the budget may stretch past the interval
+        wait = self.wait_time(now)
+        return {
+            'interval_seconds': round(self.interval, 2),
+            'wait_seconds': round(wait, 2),
+            'samples_per_minute': round(60 / wait, 2),
+            'requests_last_minute': len(self.request_times),
+            'budget_per_minute': self.calls_per_minute,
+            'budget_usage_pct': round(len(self.request_times) / self.calls_per_minute * 100, 1),
+            'volatility_pct_per_minute': round(self.volatility_pct(), 4),
+            'last_move_pct_per_minute': round(self.last_move_pct, 4),
+            'total_requests': self.total_requests
+        }
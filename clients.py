@@ -0,0 +1,56 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from config import get_settings
+
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def _get_or_create(key: str, factory):
+    # Double-checked so concurrent callers share one instance without locking the fast path
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = factory()
+                _clients[key] = client
+    return client
+
+
+def get_openai():
+    """Process-wide OpenAI client"""
+    def factory():
+        import openai
+        settings = get_settings().require('openai_api_key')
+        return openai.OpenAI(api_key=settings.openai_api_key)
+    return _get_or_create('openai', factory)
+
+
+def get_supabase(request_timeout: int = None):
+    """Process-wide Supabase client, one per request timeout (None keeps the library default)"""
+    def factory():
+        from supabase import create_client, ClientOptions
+        settings = get_settings().require('supabase_url', 'supabase_key')
+        options = ClientOptions(postgrest_client_timeout=request_timeout) if request_timeout else None
+        client = create_client(settings.supabase_url, settings.supabase_key, options=options)
+        client.debug = False
+        return client
+    return _get_or_create('supabase' if request_timeout is None else f"supabase:{request_timeout}", factory)
+
+
+def get_http_session(name: str = 'default', pool_maxsize: int = 10) -> requests.Session:
+    """Process-wide keep-alive HTTP session per upstream service (e.g. 'coingecko', 'brave', 'mailgun')
+
+    Sessions are shared per (name, pool_maxsize), so a caller asking for a larger pool
+    never gets a session that was sized for someone else.
+    """
+    def factory():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    return _get_or_create(f"http:{name}:{pool_maxsize}", factory)
@@ -0,0 +1,98 @@
+import os
+import threading
+from dataclasses import dataclass
+from dotenv import load_dotenv
+
+
+# Settings field -> environment variable, for error messages
+ENV_NAMES = {
+    'openai_api_key': 'OPENAI_API_KEY',
+    'supabase_url': 'SUPABASE_URL',
+    'supabase_key': 'SUPABASE_KEY',
+    'brave_api_key': 'BRAVE_API_KEY',
+    'mailgun_api_key': 'MAILGUN_API_KEY',
+    'mailgun_domain': 'MAILGUN_DOMAIN',
+    'mailgun_from_email': 'MAILGUN_FROM_EMAIL',
+    'coingecko_api_key': 'COINGECKO_API_KEY'
+}
+
+DIGEST_CACHE_MODES = ('skip', 'reuse', 'off')
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Configuration shared by all agents, read from the environment once per process"""
+    openai_api_key: str = None
+    supabase_url: str = None
+    supabase_key: str = None
+    brave_api_key: str = None
+    mailgun_api_key: str = None
+    mailgun_domain: str = None
+    mailgun_from_email: str = None
+    recipient_email: tuple = ()
+    coingecko_api_key: str = None
+    news_candidate_window: int = 500
+    news_top_k: int = 10
+    digest_segments_file: str = None
+    wal_path: str = '.supabase_wal.sqlite3'
+    wal_request_timeout: int = 10
+    mailgun_send_workers: int = 16
+    mailgun_rate_per_second: float = 50
+    digest_cache_mode: str = 'skip'
+    digest_cache_path: str = '.digest_cache.json'
+    digest_price_tolerance_pct: float = 0.5
+
+    def __post_init__(self):
+        if self.digest_cache_mode not in DIGEST_CACHE_MODES:
+            raise ValueError(f"DIGEST_CACHE_MODE must be one of {', '.join(DIGEST_CACHE_MODES)}, "
+                             f"got {self.digest_cache_mode!r}. Please check your .env file.")
+
+    @classmethod
+    def from_env(cls) -> 'Settings':
+        return cls(
+            openai_api_key=os.getenv('OPENAI_API_KEY'),
+            supabase_url=os.getenv('SUPABASE_URL'),
+            supabase_key=os.getenv('SUPABASE_KEY'),
+            brave_api_key=os.getenv('BRAVE_API_KEY'),
+            mailgun_api_key=os.getenv('MAILGUN_API_KEY'),
+            mailgun_domain=os.getenv('MAILGUN_DOMAIN'),
+            mailgun_from_email=os.getenv('MAILGUN_FROM_EMAIL'),
+            recipient_email=tuple(email.strip() for email in os.getenv('RECIPIENT_EMAIL', '').split(',') if email.strip()),
+            coingecko_api_key=os.getenv('COINGECKO_API_KEY'),
+            news_candidate_window=int(os.getenv('NEWS_CANDIDATE_WINDOW', '500')),
+            news_top_k=int(os.getenv('NEWS_TOP_K', '10')),
+            digest_segments_file=os.getenv('DIGEST_SEGMENTS_FILE'),
+            wal_path=os.getenv('SUPABASE_WAL_PATH', '.supabase_wal.sqlite3'),
+            wal_request_timeout=int(os.getenv('SUPABASE_WAL_TIMEOUT', '10')),
+            mailgun_send_workers=int(os.getenv('MAILGUN_SEND_WORKERS', '16')),
+            mailgun_rate_per_second=float(os.getenv('MAILGUN_RATE_PER_SECOND', '50')),
+            digest_cache_mode=os.getenv('DIGEST_CACHE_MODE', 'skip').lower(),
+            digest_cache_path=os.getenv('DIGEST_CACHE_PATH', '.digest_cache.json'),
+            digest_price_tolerance_pct=float(os.getenv('DIGEST_PRICE_TOLERANCE_PCT', '0.5'))
+        )
+
+    def require(self, *fields: str) -> 'Settings':
+        """Raise ValueError naming every missing environment variable among fields"""
+        missing = [ENV_NAMES.get(name, name.upper()) for name in fields if not getattr(self, name)]
+        if missing:
+            raise ValueError(f"{', '.join(missing)} not set in environment variables. Please check your .env file.")
+        return self
+
+    @property
+    def mailgun_api_url(self) -> str:
+        return f"https://api.mailgun.net/v3/{self.mailgun_domain}/messages"
+
+
+_settings = None
+_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """Load .env on first use and return the process-wide Settings"""
+    global _settings
+    if _settings is None:
+        with _lock:
+            if _settings is None:
+                load_dotenv(override=True)
+                _settings = Settings.from_env()
+    return _settings
@@ -0,0 +1,7 @@
+# Thin wrappers over the SQL functions in migrations/002_aggregation_functions.sql.
+# Each returns the pre-aggregated rows from a single Supabase RPC round trip.
+
+def change_since_yesterday(supabase):
+    """Latest BTC price against the price 24 hours earlier, or None when there is no data"""
+    rows = supabase.rpc('btc_change_since_yesterday', {}).execute().data
+    return rows[0] if rows else None
@@ -0,0 +1,142 @@
+import json
+import hashlib
+from dataclasses import dataclass
+
+
+ANALYSIS_PROMPT = """You are a professional financial and crypto analyst, with 20 years of experience. Analyse the following data:
+
+1. Latest Bitcoin price: {prices}
+2. Latest financial news: {news}
+
+Respond with a single JSON object with exactly these keys:
+- "price_summary": two or three sentences on the Bitcoin price and its recent trend
+- "key_news": a list of at most 6 objects with "headline", "summary" (one sentence) and "topic" ("crypto" or "macro")
+- "outlook": two or three sentences on what investors should watch next
+
+Be professional, concise and factual."""
+
+TRANSLATE_PROMPT = """Translate the following email into {language}. Keep the first line in the form "Subject: ..." and preserve the structure and numbers exactly.
+
+{content}"""
+
+SEGMENT_TITLES = {
+    ('crypto', 'macro'): 'BTC and Market Analysis',
+    ('crypto',): 'BTC and Crypto Analysis',
+    ('macro',): 'Macro Market Analysis'
+}
+
+
+@dataclass
+class Segment:
+    """An audience that receives its own rendering of the shared analysis"""
+    name: str
+    recipients: list
+    topics: tuple = ('crypto', 'macro')
+    language: str = 'English'
+    include_price: bool = True
+    include_outlook: bool = True
+
+
+def load_segments(path: str) -> list:
+    """Load segments from a JSON file: a list of objects with Segment fields"""
+    with open(path) as f:
+        raw = json.load(f)
+    segments = []
+    for entry in raw:
+        entry = dict(entry)
+        entry['topics'] = tuple(entry.get('topics', ('crypto', 'macro')))
+        segments.append(Segment(**entry))
+    return segments
+
+
+def _text(value) -> str:
+    return value.strip() if isinstance(value, str) else ''
+
+
+def normalize_analysis(raw) -> dict:
+    """Coerce the LLM's JSON into the expected shape, dropping malformed key_news items"""
+    raw = raw if isinstance(raw, dict) else {}
+    key_news = raw.get('key_news')
+    news = []
+    for item in key_news if isinstance(key_news, list) else []:
+        if not isinstance(item, dict) or not _text(item.get('headline')):
+            continue
+        topic = item.get('topic')
+        news.append({
+            'headline': _text(item.get('headline')),
+            'summary': _text(item.get('summary')),
+            'topic': topic if topic in ('crypto', 'macro') else 'macro'
+        })
+    return {
+        'price_summary': _text(raw.get('price_summary')),
+        'key_news': news,
+        'outlook': _text(raw.get('outlook'))
+    }
+
+
+class DigestPipeline:
+    """Generate one structured analysis per dataset and render it for each segment locally"""
+
+    def __init__(self, openai_client, model: str = "gpt-3.5-turbo"):
+        self.openai_client = openai_client
+        self.model = model
+        # Per-language renderings keyed by content hash, so identical renders are translated once
+        self.translations = {}
+        self.llm_calls = 0
+
+    def analyze(self, news_items: list, prices_data: list) -> dict:
+        """Make the single LLM call producing the structured analysis"""
+        completion = self.openai_client.chat.completions.create(
+            model=self.model,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": "You are a professional financial and crypto analyst, with 20 years of experience."},
+                {"role": "user", "content": ANALYSIS_PROMPT.format(prices=json.dumps(prices_data), news=json.dumps(news_items))}
+            ]
+        )
+        self.llm_calls += 1
+        return normalize_analysis(json.loads(completion.choices[0].message.content))
+
+    def render(self, analysis: dict, segment: Segment) -> str:
+        """Render an email for a segment from the shared analysis, without calling the LLM"""
+        title = SEGMENT_TITLES.get(tuple(sorted(segment.topics)), 'Market Analysis')
+        lines = [f"Subject: Financial Update - {title}", "", "Dear Valued Investor,", ""]
+
+        if segment.include_price and analysis['price_summary']:
+            lines.extend(["Bitcoin Price", analysis['price_summary'], ""])
+
+        news = [item for item in analysis['key_news'] if item['topic'] in segment.topics]
+        if news:
+            lines.append("Key News")
+            for item in news:
+                lines.append(f"- {item['headline']}: {item['summary']}" if item['summary'] else f"- {item['headline']}")
+            lines.append("")
+
+        if segment.include_outlook and analysis['outlook']:
+            lines.extend(["Outlook", analysis['outlook'], ""])
+
+        lines.extend(["Best regards,", "Financial AI Agent"])
+        return '\n'.join(lines)
+
+    def localize(self, content: str, language: str) -> str:
+        """Optional per-segment LLM pass, only for non-English segments"""
+        if language.lower() in ('english', 'en'):
+            return content
+        key = (hashlib.sha256(content.encode('utf-8')).hexdigest(), language.lower())
+        if key not in self.translations:
+            completion = self.openai_client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": TRANSLATE_PROMPT.format(language=language, content=content)}]
+            )
+            self.llm_calls += 1
+            self.translations[key] = completion.choices[0].message.content
+        return self.translations[key]
+
+    def build(self, news_items: list, prices_data: list, segments: list) -> dict:
+        """Return {segment name: email content} using one analysis for all segments"""
+        analysis = self.analyze(news_items, prices_data)
+        emails = {}
+        for segment in segments:
+            emails[segment.name] = self.localize(self.render(analysis, segment), segment.language)
+        print(f"Rendered {len(emails)} segment emails with {self.llm_calls} LLM calls")
+        return emails
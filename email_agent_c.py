@@ -1,91 +1,101 @@
-import os
-import requests
-from datetime import datetime, timezone
-from supabase import create_client, Client
 import json
-from dotenv import load_dotenv
-import openai
+import argparse
 from requests.auth import HTTPBasicAuth
 from typing import Any
-
-# Load environment variables from .env file
-load_dotenv(override=True)
-
-# Initialize OpenAI client
-openai.api_key = os.getenv('OPENAI_API_KEY')
-if not openai.api_key:
-    raise ValueError("OPENAI_API_KEY is not set in the environment variables.")
-
-# Initialize Supabase client
-SUPABASE_URL = os.getenv('SUPABASE_URL')
-SUPABASE_KEY = os.getenv('SUPABASE_KEY')
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+from news_ranking import NewsRanker
+from digest import DigestPipeline, Segment, load_segments
+from records import parse_news_csv, PriceSeries
+from email_delivery import split_subject, load_recipients, ParallelMailer
+from config import get_settings
+from clients import get_openai, get_supabase, get_http_session
+from run_cache import DigestCache, fingerprint
+from db_aggregates import change_since_yesterday
+from profiling import profile_run
 
 class FinancialEmailAgent:
     def __init__(self):
-        # Initialize OpenAI client
-        self.openai_client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        # Use the global Supabase client
-        self.supabase = supabase
+        self.settings = get_settings().require('openai_api_key', 'supabase_url', 'supabase_key',
+                                               'mailgun_api_key', 'mailgun_domain', 'mailgun_from_email')
+        self.openai_client = get_openai()
+        self.supabase = get_supabase()
+        self.http = get_http_session('mailgun')
 
         # Mailgun configuration
-        self.MAILGUN_API_KEY = os.getenv('MAILGUN_API_KEY')
-        self.MAILGUN_DOMAIN = os.getenv('MAILGUN_DOMAIN')
-        self.MAILGUN_API_URL = f"https://api.mailgun.net/v3/{self.MAILGUN_DOMAIN}/messages"
-        self.MAILGUN_FROM_EMAIL = os.getenv('MAILGUN_FROM_EMAIL')
-        self.RECIPIENT_EMAIL = os.getenv('RECIPIENT_EMAIL', '').split(',')
+        self.MAILGUN_API_KEY = self.settings.mailgun_api_key
+        self.MAILGUN_DOMAIN = self.settings.mailgun_domain
+        self.MAILGUN_API_URL = self.settings.mailgun_api_url
+        self.MAILGUN_FROM_EMAIL = self.settings.mailgun_from_email
+        self.RECIPIENT_EMAIL = list(self.settings.recipient_email)
+
+        # News ranking: candidates are drawn from a wide window, only the top stories reach the prompt
+        self.news_ranker = NewsRanker()
+        self.NEWS_CANDIDATE_WINDOW = self.settings.news_candidate_window
+        self.NEWS_TOP_K = self.settings.news_top_k
+
+        # Last generated email, keyed by a fingerprint of the data it was generated from
+        self.digest_cache = DigestCache(self.settings.digest_cache_path)
     
     def get_latest_data(self) -> dict[str, Any]:
         # Fetch the latest entries from eco_info and bc_prices tables in Supabase
         try:
-            # Fetch the latest entries (last 10)
+            # Fetch the latest candidate entries for ranking
             news_response = self.supabase.table('eco_info') \
-                .select('*') \
+                .select('id, timestamp, finance_info') \
                 .order('timestamp', desc=True) \
-                .limit(10) \
+                .limit(self.NEWS_CANDIDATE_WINDOW) \
+                .csv() \
                 .execute()
 
             # Fetch the latest BTC price (last 5)
             prices_response = self.supabase.table('btc_price') \
-                .select('*') \
+                .select('price, timestamp') \
                 .order('timestamp', desc=True) \
                 .limit(5) \
+                .csv() \
                 .execute()
 
+            # Fetched as CSV and parsed straight into compact records, so no per-row dicts are built
+            news = parse_news_csv(news_response.data)
+            prices = PriceSeries.from_csv(prices_response.data)
+
             # Add these debug prints
-            print(f"News data:", news_response.data)
-            print(f"Price data:", prices_response.data)
+            print(f"News data: {len(news)} candidate items")
+            print(f"Price data: {len(prices)} prices, latest ${prices.latest or 0:,.2f}")
 
             return {
-                'news': news_response.data,
-                'prices': prices_response.data
+                'news': news,
+                'prices': prices,
+                'price_change': self.get_price_change()
             }
         except Exception as e:
             print(f"Error fetching data: {e}")
-            return {'news': [], 'prices': []}
+            return {'news': [], 'prices': PriceSeries()}
     
+    def get_price_change(self) -> dict[str, Any] | None:
+        # 24h change computed in the database (migrations/002_aggregation_functions.sql)
+        try:
+            return change_since_yesterday(self.supabase)
+        except Exception as e:
+            print(f"Price change RPC unavailable: {e}")
+            return None
+
+    def prepare_prompt_data(self, data: dict[str, Any]) -> tuple[list, list]:
+        # Rank and cluster the candidate news, keeping one representative per story
+        news_items = self.news_ranker.rank(data['news'], top_k=self.NEWS_TOP_K)
+        prices_data = data['prices'].to_prompt()
+        return news_items, prices_data
+
     def generate_email_content(self, data: dict[str, Any]) -> str:
         # Generate email content using OpenAI
         try:
-            # Format the data for the prompt
-            news_items = []
-            for item in data['news']:
-                try:
-                    # Handle cases where finance_info might already be a dict
-                    if isinstance(item['finance_info'], str):
-                        news_items.append(item['finance_info'])
-                    else:
-                        news_items.append(item['finance_info'])
-                except (json.JSONDecodeError, KeyError):
-                    continue
-
-            prices_data = [{'price': item['price'], 'timestamp': item['timestamp']} for item in data['prices']]
+            news_items, prices_data = self.prepare_prompt_data(data)
             
             # Create the prompt
             prompt = f"""You are a professional financial and crypto analyst, with 20 years of experience. Generate a very concise financial email with analysis of the following data: 
             
             1. Latest Bitcoin price: {json.dumps(prices_data)}
             2. Latest financial news: {json.dumps(news_items)}
+            3. Bitcoin price change over the last 24 hours: {json.dumps(data.get('price_change'))}
 
             Requirements:
             - Start the email with "Subject: Financial Update - BTC and Market Analysis"
@@ -121,36 +131,29 @@ class FinancialEmailAgent:
             print(f"Error generating email content: {e}")
             return ""
         
-    def send_email(self, content: str) -> bool:
+    def send_email(self, content: str, recipients: list[str] = None) -> bool:
+        if recipients is None:
+            recipients = self.RECIPIENT_EMAIL
+        if not recipients:
+            print("No recipients to send the email to.")
+            return False
         try:
-            lines = content.split('\n')
-            # Set default subject
-            subject = 'Financial Update'  # Default subject
-            
-            # Try to find a subject line in the content
-            for line in lines:
-                if line.lower().startswith('subject:'):
-                    subject = line.replace('Subject:', '').strip()
-                    # Remove this line from the content
-                    lines.remove(line)
-                    break
-
-            # Join remaining lines for email body
-            email_body = '\n'.join(lines)
+            # Split the subject line from the body, defaulting to 'Financial Update'
+            subject, email_body = split_subject(content)
 
             # Add debug prints
             print(f"Sending email with:")
             print(f"Subject: {subject}")
             print(f"From: {self.MAILGUN_FROM_EMAIL}")
-            print(f"To: {', '.join(self.RECIPIENT_EMAIL)}")
+            print(f"To: {', '.join(recipients)}")
             print(f"URL: {self.MAILGUN_API_URL}")
             
-            response = requests.post(
+            response = self.http.post(
                 self.MAILGUN_API_URL,
                 auth=HTTPBasicAuth("api", self.MAILGUN_API_KEY),
                 data={
                     "from": self.MAILGUN_FROM_EMAIL,
-                    "to": self.RECIPIENT_EMAIL,  # Mailgun accepts a list of recipients
+                    "to": recipients,  # Mailgun accepts a list of recipients
                     "subject": subject,
                     "text": email_body
                 }
@@ -170,20 +173,8 @@ class FinancialEmailAgent:
         
     def send_to_mailing_list(self, content: str) -> bool:
         try:
-            lines = content.split('\n')
-            # Set default subject
-            subject = 'Financial Update'  # Default subject
-            
-            # Try to find a subject line in the content
-            for line in lines:
-                if line.lower().startswith('subject:'):
-                    subject = line.replace('Subject:', '').strip()
-                    # Remove this line from the content
-                    lines.remove(line)
-                    break
-
-            # Join remaining lines for email body
-            email_body = '\n'.join(lines)
+            # Split the subject line from the body, defaulting to 'Financial Update'
+            subject, email_body = split_subject(content)
 
             # Add debug prints
             print(f"Sending email with:")
@@ -192,7 +183,7 @@ class FinancialEmailAgent:
             print(f"To: {', '.join(self.RECIPIENT_EMAIL)}")
             print(f"URL: {self.MAILGUN_API_URL}")
             
-            response = requests.post(
+            response = self.http.post(
                 self.MAILGUN_API_URL,
                 auth=HTTPBasicAuth("api", self.MAILGUN_API_KEY),
                 data={
@@ -224,23 +215,110 @@ class FinancialEmailAgent:
             if not data['news'] or not data['prices']:
                 print("No data available to generate email.")
                 return
+
+            # Skip or reuse the last email when neither the news nor the bucketed price changed
+            data_fingerprint = fingerprint(data['news'], data['prices'].latest, self.settings.digest_price_tolerance_pct)
+            cached_content = None
+            if self.settings.digest_cache_mode != 'off':
+                cached_content = self.digest_cache.lookup(data_fingerprint)
+            if cached_content and self.settings.digest_cache_mode == 'skip':
+                print("No new data since the last email, skipping generation.")
+                return
             
             # Generate email content
-            email_content = self.generate_email_content(data)
+            email_content = cached_content or self.generate_email_content(data)
             if not email_content:
                 print("Failed to generate email content.")
                 return
+            if cached_content:
+                print("No new data since the last email, reusing the cached content.")
             
             # Send the email
             if not self.send_email(email_content):
                 print("Failed to send email.")
                 return
+
+            if self.settings.digest_cache_mode != 'off':
+                self.digest_cache.store(data_fingerprint, email_content)
             
             print("Email sent successfully.")
 
         except Exception as e:
             print(f"Error running the email agent: {e}")
 
+    def get_segments(self) -> list[Segment]:
+        # Segments come from DIGEST_SEGMENTS_FILE, defaulting to one segment for RECIPIENT_EMAIL
+        segments_file = self.settings.digest_segments_file
+        if segments_file:
+            return load_segments(segments_file)
+        return [Segment(name='default', recipients=self.RECIPIENT_EMAIL)]
+
+    def run_digest(self) -> None:
+        # Generate one structured analysis and send a rendering of it to every segment
+        try:
+            data = self.get_latest_data()
+
+            if not data['news'] or not data['prices']:
+                print("No data available to generate email.")
+                return
+
+            news_items, prices_data = self.prepare_prompt_data(data)
+            segments = []
+            for segment in self.get_segments():
+                if segment.recipients:
+                    segments.append(segment)
+                else:
+                    print(f"Skipping segment {segment.name}: no recipients.")
+            if not segments:
+                print("No segments with recipients.")
+                return
+
+            pipeline = DigestPipeline(self.openai_client)
+            emails = pipeline.build(news_items, prices_data, segments)
+
+            for segment in segments:
+                if not self.send_email(emails[segment.name], recipients=segment.recipients):
+                    print(f"Failed to send digest to segment {segment.name}.")
+
+        except Exception as e:
+            print(f"Error running the digest: {e}")
+
+    def run_personalized(self, recipients_file: str) -> None:
+        # Generate the email once and deliver a personalized copy to every recipient in the CSV
+        try:
+            data = self.get_latest_data()
+
+            if not data['news'] or not data['prices']:
+                print("No data available to generate email.")
+                return
+
+            email_content = self.generate_email_content(data)
+            if not email_content:
+                print("Failed to generate email content.")
+                return
+
+            mailer = ParallelMailer(
+                self.settings,
+                send_workers=self.settings.mailgun_send_workers,
+                rate_per_second=self.settings.mailgun_rate_per_second
+            )
+            mailer.deliver(email_content, load_recipients(recipients_file), data['prices'].latest)
+
+        except Exception as e:
+            print(f"Error running personalized delivery: {e}")
+
 if __name__ == "__main__":
-    agent = FinancialEmailAgent()
-    agent.run()
+    parser = argparse.ArgumentParser(description="Generate and send the financial update email")
+    parser.add_argument('--digest', action='store_true', help="Send per-segment digests rendered from a single analysis")
+    parser.add_argument('--recipients-file', help="CSV of recipients (email, name, btc_holdings, cost_basis) for personalized delivery")
+    parser.add_argument('--profile', action='store_true', help="Write a flame graph and timing/allocation report to profiles/")
+    args = parser.parse_args()
+
+    with profile_run('email_agent', args.profile):
+        agent = FinancialEmailAgent()
+        if args.recipients_file:
+            agent.run_personalized(args.recipients_file)
+        elif args.digest:
+            agent.run_digest()
+        else:
+            agent.run()
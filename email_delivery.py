@@ -0,0 +1,173 @@
+import os
+import csv
+import time
+import threading
+from collections import deque
+from string import Template
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from requests.auth import HTTPBasicAuth
+from clients import get_http_session
+from rate_limit import RateLimiter
+
+
+DEFAULT_SUBJECT = 'Financial Update'
+GREETING = 'Dear Valued Investor,'
+
+
+def split_subject(content: str) -> tuple[str, str]:
+    """Return (subject, body) from generated content whose first 'Subject:' line is the subject"""
+    lines = content.split('\n')
+    for i, line in enumerate(lines):
+        if line.lower().startswith('subject:'):
+            return line[len('subject:'):].strip(), '\n'.join(lines[:i] + lines[i + 1:])
+    return DEFAULT_SUBJECT, content
+
+
+def post_mailgun(session, settings, to, subject: str, text: str, timeout: float = 30):
+    """Send one message through the Mailgun messages API; returns the HTTP response"""
+    return session.post(
+        settings.mailgun_api_url,
+        auth=HTTPBasicAuth("api", settings.mailgun_api_key),
+        data={"from": settings.mailgun_from_email, "to": to, "subject": subject, "text": text},
+        timeout=timeout
+    )
+
+
+class DigestTemplate:
+    """Generated email content parsed once into a per-recipient template"""
+
+    def __init__(self, subject: str, body: str):
+        self.subject = subject
+        self.body = body
+
+    @classmethod
+    def from_content(cls, content: str) -> 'DigestTemplate':
+        subject, body = split_subject(content)
+        # Escape literal '$' (prices) before adding placeholders for the personalized parts
+        body = body.replace('$', '$$')
+        if GREETING in body:
+            body = body.replace(GREETING, 'Dear ${name},${portfolio_block}', 1)
+        else:
+            body = 'Dear ${name},${portfolio_block}\n\n' + body
+        return cls(subject, body)
+
+
+def portfolio_line(holdings: float, cost_basis: float, btc_price: float) -> str:
+    """One-line BTC P&L summary for a recipient's position"""
+    if not holdings:
+        return ''
+    value = holdings * btc_price
+    if not cost_basis:
+        return f"Your {holdings:g} BTC position is worth ${value:,.2f}."
+    pnl = value - holdings * cost_basis
+    pnl_pct = pnl / (holdings * cost_basis) * 100
+    return f"Your {holdings:g} BTC position is worth ${value:,.2f} ({'+' if pnl >= 0 else '-'}${abs(pnl):,.2f}, {pnl_pct:+.2f}% vs cost basis)."
+
+
+def render_chunk(subject: str, body: str, recipients: list, btc_price: float) -> list:
+    """Render bodies for a chunk of recipients; runs in a worker process"""
+    template = Template(body)
+    rendered = []
+    for recipient in recipients:
+        line = portfolio_line(recipient['btc_holdings'], recipient['cost_basis'], btc_price)
+        text = template.substitute(name=recipient['name'] or 'Valued Investor',
+                                   portfolio_block=f"\n\n{line}" if line else '')
+        rendered.append((recipient['email'], subject, text))
+    return rendered
+
+
+def load_recipients(path: str) -> list:
+    """Read recipients from a CSV with email, name, btc_holdings and cost_basis columns.
+
+    Rows with a malformed number are skipped and logged rather than aborting the delivery.
+    """
+    recipients = []
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            if not row.get('email'):
+                continue
+            try:
+                holdings = float(row.get('btc_holdings') or 0)
+                cost_basis = float(row.get('cost_basis') or 0)
+            except ValueError as e:
+                print(f"Skipping recipient {row['email'].strip()} on line {reader.line_num} of {path}: {e}")
+                continue
+            recipients.append({
+                'email': row['email'].strip(),
+                'name': (row.get('name') or '').strip(),
+                'btc_holdings': holdings,
+                'cost_basis': cost_basis
+            })
+    return recipients
+
+
+class ParallelMailer:
+    """Render personalized digests across processes and send them across pooled HTTP connections"""
+
+    def __init__(self,
+                 settings,
+                 render_workers: int = None,
+                 send_workers: int = 16,
+                 rate_per_second: float = 50,
+                 chunk_size: int = 1000):
+        self.settings = settings
+        self.render_workers = render_workers or os.cpu_count() or 1
+        self.send_workers = send_workers
+        # Let the senders drain a one-second burst after an idle spell
+        self.rate_limiter = RateLimiter(rate_per_second, burst=max(1, int(rate_per_second)))
+        self.chunk_size = chunk_size
+        # Bounds memory: a couple of chunks rendered ahead, and a few bodies per sender queued
+        self.render_ahead = 2 * self.render_workers
+        self.max_queued_sends = 4 * send_workers
+        self.session = get_http_session('mailgun', pool_maxsize=send_workers)
+
+    def send_one(self, email: str, subject: str, body: str) -> bool:
+        self.rate_limiter.wait()
+        try:
+            response = post_mailgun(self.session, self.settings, email, subject, body)
+            if response.status_code == 200:
+                return True
+            print(f"Failed to send email to {email}. Status code: {response.status_code}")
+        except Exception as e:
+            print(f"Error sending email to {email}: {e}")
+        return False
+
+    def _submit_sends(self, senders, rendered: list, queued, send_futures: list):
+        for email, subject, body in rendered:
+            # Blocks while max_queued_sends bodies are waiting for a sender thread
+            queued.acquire()
+            future = senders.submit(self.send_one, email, subject, body)
+            future.add_done_callback(lambda _: queued.release())
+            send_futures.append(future)
+
+    def deliver(self, content: str, recipients: list, btc_price: float) -> dict:
+        """Send a personalized copy of content to every recipient; returns delivery stats"""
+        template = DigestTemplate.from_content(content)
+        chunks = (recipients[i:i + self.chunk_size] for i in range(0, len(recipients), self.chunk_size))
+        queued = threading.BoundedSemaphore(self.max_queued_sends)
+        started = time.monotonic()
+        sent = failed = 0
+
+        with ProcessPoolExecutor(max_workers=self.render_workers) as renderers, \
+                ThreadPoolExecutor(max_workers=self.send_workers) as senders:
+            renders = deque()
+            send_futures = []
+            # Sending starts as soon as the first chunk is rendered, and rendering only runs
+            # render_ahead chunks ahead of the senders
+            for chunk in chunks:
+                renders.append(renderers.submit(render_chunk, template.subject, template.body, chunk, btc_price))
+                if len(renders) >= self.render_ahead:
+                    self._submit_sends(senders, renders.popleft().result(), queued, send_futures)
+            while renders:
+                self._submit_sends(senders, renders.popleft().result(), queued, send_futures)
+            for send_future in as_completed(send_futures):
+                if send_future.result():
+                    sent += 1
+                else:
+                    failed += 1
+
+        elapsed = time.monotonic() - started
+        rate = sent / elapsed if elapsed else 0.0
+        print(f"Delivered {sent} emails ({failed} failed) in {elapsed:.1f}s - {rate:.1f} messages/sec")
+        return {'sent': sent, 'failed': failed, 'seconds': elapsed, 'messages_per_second': rate}
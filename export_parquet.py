@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import argparse
+from datetime import datetime, timezone, timedelta
+from config import get_settings
+from clients import get_supabase
+import pyarrow as pa
+import pyarrow.parquet as pq
+from records import to_epoch
+from supabase_reader import iter_pages
+
+
+TIMESTAMP_TYPE = pa.timestamp('us', tz='UTC')
+
+TABLES = {
+    'btc_price': {
+        'columns': 'id, timestamp, price',
+        'schema': pa.schema([('id', pa.int64()), ('timestamp', TIMESTAMP_TYPE), ('price', pa.float64())])
+    },
+    'eco_info': {
+        'columns': 'id, timestamp, finance_info',
+        'schema': pa.schema([('id', pa.int64()), ('timestamp', TIMESTAMP_TYPE), ('finance_info', pa.string())])
+    }
+}
+
+
+class DayPartitionWriter:
+    """Write one table's rows into date=YYYY-MM-DD Parquet partitions, one day at a time"""
+
+    def __init__(self, table_dir: str, schema: pa.Schema, batch_rows: int):
+        self.table_dir = table_dir
+        self.schema = schema
+        self.batch_rows = batch_rows
+        self.day = None
+        self.writer = None
+        self.tmp_path = None
+        self.final_path = None
+        self.columns = {name: [] for name in schema.names}
+        self.rows_written = 0
+
+    def _flush_batch(self):
+        if not self.columns['id']:
+            return
+        batch = pa.record_batch(
+            [pa.array(self.columns[name], type=self.schema.field(name).type) for name in self.schema.names],
+            schema=self.schema
+        )
+        self.writer.write_batch(batch)
+        self.rows_written += batch.num_rows
+        for values in self.columns.values():
+            values.clear()
+
+    def open_day(self, day):
+        partition_dir = os.path.join(self.table_dir, f"date={day.isoformat()}")
+        os.makedirs(partition_dir, exist_ok=True)
+        self.day = day
+        self.final_path = os.path.join(partition_dir, 'part-0.parquet')
+        # Written under a temp name and renamed on close so readers never see partial partitions
+        self.tmp_path = self.final_path + '.tmp'
+        self.writer = pq.ParquetWriter(self.tmp_path, self.schema, compression='zstd')
+
+    def close_day(self):
+        """Finish the current partition; returns the day that was completed"""
+        if self.writer is None:
+            return None
+        self._flush_batch()
+        self.writer.close()
+        os.replace(self.tmp_path, self.final_path)
+        day, self.day, self.writer = self.day, None, None
+        return day
+
+    def append(self, day, row: dict) -> object:
+        """Add a row; returns the previous day if this row started a new partition"""
+        completed = None
+        if day != self.day:
+            completed = self.close_day()
+            self.open_day(day)
+        for name in self.schema.names:
+            self.columns[name].append(row[name])
+        if len(self.columns['id']) >= self.batch_rows:
+            self._flush_batch()
+        return completed
+
+
+class ParquetExporter:
+    def __init__(self, output_dir: str = 'exports', page_size: int = 1000, batch_rows: int = 50_000):
+        self.settings = get_settings().require('supabase_url', 'supabase_key')
+        self.supabase = get_supabase()
+
+        self.output_dir = output_dir
+        self.page_size = page_size
+        self.batch_rows = batch_rows
+        self.state_path = os.path.join(output_dir, '_export_state.json')
+
+    def load_state(self) -> dict:
+        """Return {table: {'last_day': last fully exported day (YYYY-MM-DD), 'last_id': highest id seen}}"""
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def save_state(self, state: dict):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def max_id(self, table: str) -> int:
+        rows = self.supabase.table(table).select('id').order('id', desc=True).limit(1).execute().data
+        return rows[0]['id'] if rows else 0
+
+    def late_days(self, table: str, after_id: int, up_to_id: int, before: datetime) -> list:
+        """Days before `before` that gained rows with after_id < id <= up_to_id since they were exported"""
+        days = set()
+        for page in iter_pages(self.supabase, table, columns='id, timestamp', page_size=self.page_size,
+                               order_column='id', tiebreak_column=None, start=after_id + 1, end=up_to_id + 1):
+            for raw in page:
+                epoch = to_epoch(raw['timestamp'])
+                if epoch < before.timestamp():
+                    days.add(datetime.fromtimestamp(epoch, tz=timezone.utc).date())
+        return sorted(days)
+
+    def write_pages(self, table: str, writer: DayPartitionWriter, start, end, on_day_complete=None):
+        for page in iter_pages(self.supabase, table, columns=TABLES[table]['columns'], page_size=self.page_size,
+                               start=start, end=end):
+            for raw in page:
+                epoch = to_epoch(raw['timestamp'])
+                row = dict(raw)
+                row['timestamp'] = int(epoch * 1_000_000)
+                if table == 'eco_info' and row['finance_info'] is not None and not isinstance(row['finance_info'], str):
+                    row['finance_info'] = json.dumps(row['finance_info'])
+                completed = writer.append(datetime.fromtimestamp(epoch, tz=timezone.utc).date(), row)
+                if completed and on_day_complete:
+                    on_day_complete(completed)
+        return writer.close_day()
+
+    def export_table(self, table: str, state: dict, until: datetime) -> int:
+        """Export complete days after the last exported one, up to (not including) until.
+
+        Days that were already exported are rewritten when rows with a higher id than the
+        last run's show up in them (WAL replays after an outage, backfills).
+        """
+        spec = TABLES[table]
+        entry = state.setdefault(table, {'last_day': None, 'last_id': None})
+        # Rows inserted after this point are picked up by the next run
+        high_id = self.max_id(table)
+        table_dir = os.path.join(self.output_dir, table)
+        rows_written = 0
+
+        start = None
+        if entry['last_day']:
+            start = datetime.fromisoformat(entry['last_day']).replace(tzinfo=timezone.utc) + timedelta(days=1)
+            if entry['last_id'] is not None and high_id > entry['last_id']:
+                for day in self.late_days(table, entry['last_id'], high_id, start):
+                    day_start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+                    writer = DayPartitionWriter(table_dir, spec['schema'], self.batch_rows)
+                    self.write_pages(table, writer, day_start, day_start + timedelta(days=1))
+                    rows_written += writer.rows_written
+                    print(f"{table}: rewrote {day.isoformat()} with late rows ({writer.rows_written} rows)")
+
+        completed = None
+        if start is None or start < until:
+            def day_complete(day):
+                entry['last_day'] = day.isoformat()
+                self.save_state(state)
+
+            writer = DayPartitionWriter(table_dir, spec['schema'], self.batch_rows)
+            completed = self.write_pages(table, writer, start, until, day_complete)
+            rows_written += writer.rows_written
+
+        # Days up to until are complete even when they had no rows
+        entry['last_day'] = (until - timedelta(days=1)).date().isoformat()
+        entry['last_id'] = high_id
+        self.save_state(state)
+        print(f"{table}: exported {rows_written} rows"
+              + (f", last partition {completed.isoformat()}" if completed else ""))
+        return rows_written
+
+    def run(self, tables: list = None) -> int:
+        """Incrementally export tables; only whole UTC days before today are written"""
+        state = self.load_state()
+        until = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        started = time.monotonic()
+        total = sum(self.export_table(table, state, until) for table in (tables or TABLES))
+        print(f"Exported {total} rows in {time.monotonic() - started:.1f}s to {self.output_dir}")
+        return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally export btc_price and eco_info to day-partitioned Parquet")
+    parser.add_argument('--output-dir', default='exports', help="Root directory for the Parquet partitions")
+    parser.add_argument('--tables', nargs='+', choices=list(TABLES), help="Tables to export (default: all)")
+    parser.add_argument('--page-size', type=int, default=1000, help="Rows per Supabase request")
+    args = parser.parse_args()
+
+    exporter = ParquetExporter(output_dir=args.output_dir, page_size=args.page_size)
+    exporter.run(args.tables)
+
+
+if __name__ == "__main__":
+    main()
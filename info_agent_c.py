@@ -1,35 +1,28 @@
-import os
-import requests
 from datetime import datetime, timezone
-from supabase import create_client
 import json
-from dotenv import load_dotenv
-import openai
+import argparse
+from news_dedup import NewsDedupIndex, embed, signature
+from write_ahead_log import WriteAheadLog
+from config import get_settings
+from clients import get_openai, get_supabase, get_http_session
+from profiling import profile_run
 
 class InfoAgent:
     def __init__(self):
-        # Load environment variables
-        load_dotenv(override=True)
-        
-        # Initialize OpenAI
-        self.openai_key = os.getenv('OPENAI_API_KEY')
-        if not self.openai_key:
-            raise ValueError("OPENAI_API_KEY is not set in environment variables")
-        openai.api_key = self.openai_key
-        
-        # Initialize Supabase
-        self.supabase_url = os.getenv('SUPABASE_URL')
-        self.supabase_key = os.getenv('SUPABASE_KEY')
-        if not self.supabase_url or not self.supabase_key:
-            raise ValueError("Supabase credentials not found in environment variables")
-        
-        self.supabase = create_client(self.supabase_url, self.supabase_key)
-        self.supabase.debug = False
-        
-        # Initialize Brave API
-        self.brave_key = os.getenv('BRAVE_API_KEY')
-        if not self.brave_key:
-            raise ValueError("BRAVE_API_KEY is not set in environment variables")
+        self.settings = get_settings().require('openai_api_key', 'supabase_url', 'supabase_key', 'brave_api_key')
+        self.openai_client = get_openai()
+        self.supabase = get_supabase()
+        self.http = get_http_session('brave')
+        self.brave_key = self.settings.brave_api_key
+
+        # Inserts go through the local write-ahead log and are flushed in the background,
+        # on a client with a short timeout so shutdown never waits out a hung request
+        wal_client = get_supabase(request_timeout=self.settings.wal_request_timeout)
+        self.wal = WriteAheadLog(wal_client, path=self.settings.wal_path).start()
+
+        # Near-duplicate index over recent news, seeded from eco_info on first use
+        self.dedup_index = NewsDedupIndex()
+        self.dedup_seeded = False
 
     def search_brave(self, query: str) -> dict:
         """Search using Brave Search API"""
@@ -40,26 +33,53 @@ class InfoAgent:
         }
         
         url = f"https://api.search.brave.com/res/v1/web/search?q={query}"
-        response = requests.get(url, headers=headers)
+        response = self.http.get(url, headers=headers, timeout=30)
         
         if response.status_code == 200:
             return response.json()
         else:
             raise Exception(f"Brave Search API error: {response.status_code} - {response.text}")
 
+    def seed_dedup_index(self):
+        """Index the most recent stored news items for near-duplicate detection"""
+        self.dedup_seeded = True
+        try:
+            response = self.supabase.table('eco_info') \
+                .select('finance_info') \
+                .order('timestamp', desc=True) \
+                .limit(self.dedup_index.capacity) \
+                .execute()
+            for row in reversed(response.data):
+                if isinstance(row.get('finance_info'), str):
+                    self.dedup_index.add(row['finance_info'])
+        except Exception as e:
+            print(f"Error seeding news dedup index: {str(e)}")
+
     def store_news_in_db(self, news_item: str):
-        """Store a news item in Supabase"""
+        """Queue a news item for Supabase, skipping near-duplicates of recent news"""
+        if not self.dedup_seeded:
+            self.seed_dedup_index()
+
+        vector = embed(news_item)
+        sig = signature(vector) if vector else None
+        duplicate = self.dedup_index.find_duplicate(news_item, vector, sig)
+        if duplicate:
+            print(f"Skipping near-duplicate news item (similarity {duplicate[1]:.2f}).")
+            return None
+
         data = {
             'timestamp': datetime.now(timezone.utc).isoformat(),
             'finance_info': news_item
         }
         
         try:
-            response = self.supabase.table('eco_info').insert(data).execute()
-            print("News item successfully stored in Supabase.")
-            return response
+            key = self.wal.append('eco_info', data)
         except Exception as e:
-            raise Exception(f"Supabase Insert Error: {str(e)}")
+            raise Exception(f"Write-ahead log error: {str(e)}")
+        # Only index what was actually queued, so a failed append can be retried
+        self.dedup_index.add(news_item, vector, sig)
+        print("News item queued for Supabase.")
+        return key
 
     def get_finance_news(self):
         """Main method to get finance news using OpenAI function calling"""
@@ -96,7 +116,7 @@ class InfoAgent:
                 }
             ]
             
-            completion = openai.chat.completions.create(
+            completion = self.openai_client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=messages,
                 tools=tools
@@ -123,7 +143,7 @@ class InfoAgent:
                 }
             ]
 
-            completion = openai.chat.completions.create(
+            completion = self.openai_client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=messages,
                 tools=tools
@@ -148,7 +168,7 @@ class InfoAgent:
                 {"role": "system", "content": "You are a helpful assistant."},
                 {"role": "user", "content": "Hello, how are you?"}
             ]
-            completion = openai.chat.completions.create(
+            completion = self.openai_client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=messages
             )
@@ -173,6 +193,8 @@ class InfoAgent:
         """Test Supabase connection"""
         try:
             self.store_news_in_db("Test finance news item.")
+            # Deliver synchronously so the test exercises the Supabase insert itself
+            self.wal.flush()
             print("Supabase Insert Test Passed.")
             return True
         except Exception as e:
@@ -180,11 +202,19 @@ class InfoAgent:
             return False
 
 def main():
-    agent = InfoAgent()
-    agent.get_finance_news()
-    # agent.test_openai()
-    # agent.test_brave_search()
-    # agent.test_supabase_insert()
+    parser = argparse.ArgumentParser(description="Fetch, summarize and store financial news")
+    parser.add_argument('--profile', action='store_true', help="Write a flame graph and timing/allocation report to profiles/")
+    args = parser.parse_args()
+
+    with profile_run('info_agent', args.profile):
+        agent = InfoAgent()
+        try:
+            agent.get_finance_news()
+            # agent.test_openai()
+            # agent.test_brave_search()
+            # agent.test_supabase_insert()
+        finally:
+            agent.wal.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,9 @@
+-- Idempotency keys for rows delivered through the local write-ahead log (write_ahead_log.py).
+-- The WAL flusher upserts with on_conflict=idempotency_key and ignore-duplicates, so a batch
+-- that is retried after a lost response is never inserted twice.
+
+alter table btc_price add column if not exists idempotency_key uuid;
+create unique index if not exists btc_price_idempotency_key_idx on btc_price (idempotency_key);
+
+alter table eco_info add column if not exists idempotency_key uuid;
+create unique index if not exists eco_info_idempotency_key_idx on eco_info (idempotency_key);
@@ -0,0 +1,179 @@
+-- Server-side aggregations called through Supabase RPC (db_aggregates.py).
+-- Each call returns a handful of pre-aggregated rows instead of the raw table.
+
+-- Topic of an eco_info row, computed exactly like NewsRanker.score() in news_ranking.py:
+-- tokens as in news_dedup.tokenize(), summed MACRO_TERMS and CRYPTO_TERMS weights, crypto
+-- when its weight is higher, macro when any macro term matched, otherwise other.
+-- Keep the term list in sync with news_ranking.py.
+create or replace function news_topic(finance_info text)
+returns text
+language sql
+immutable
+as $$
+    with tokens as (
+        select distinct btrim(m[1], '.') as token
+        from regexp_matches(
+            lower(regexp_replace(coalesce(finance_info, ''), '<[^>]+>', ' ', 'g')),
+            '([a-z0-9$%.]+)', 'g'
+        ) as m
+    ),
+    terms (term, topic, weight) as (
+        values
+            ('fed', 'macro', 2.0), ('federal', 'macro', 1.0), ('fomc', 'macro', 2.5), ('powell', 'macro', 1.5),
+            ('rate', 'macro', 1.5), ('rates', 'macro', 1.5), ('inflation', 'macro', 2.0), ('cpi', 'macro', 2.5),
+            ('pce', 'macro', 2.0), ('gdp', 'macro', 2.0), ('recession', 'macro', 2.0), ('jobs', 'macro', 1.5),
+            ('payrolls', 'macro', 2.0), ('unemployment', 'macro', 1.5), ('treasury', 'macro', 1.5),
+            ('yields', 'macro', 1.5), ('tariff', 'macro', 1.5), ('tariffs', 'macro', 1.5), ('ecb', 'macro', 1.5),
+            ('dollar', 'macro', 1.0), ('stocks', 'macro', 1.0), ('markets', 'macro', 0.5),
+            ('bitcoin', 'crypto', 2.5), ('btc', 'crypto', 2.5), ('crypto', 'crypto', 1.5),
+            ('cryptocurrency', 'crypto', 1.5), ('etf', 'crypto', 2.0), ('etfs', 'crypto', 2.0),
+            ('halving', 'crypto', 2.0), ('sec', 'crypto', 1.5), ('stablecoin', 'crypto', 1.5),
+            ('ethereum', 'crypto', 1.0), ('blackrock', 'crypto', 1.0), ('mining', 'crypto', 1.0),
+            ('miners', 'crypto', 1.0), ('regulation', 'crypto', 1.0), ('inflows', 'crypto', 1.5),
+            ('outflows', 'crypto', 1.5)
+    ),
+    scores as (
+        select
+            coalesce(sum(terms.weight) filter (where terms.topic = 'macro'), 0) as macro,
+            coalesce(sum(terms.weight) filter (where terms.topic = 'crypto'), 0) as crypto
+        from tokens
+        join terms on terms.term = tokens.token
+    )
+    select case
+        when crypto > macro then 'crypto'
+        when macro > 0 then 'macro'
+        else 'other'
+    end
+    from scores
+$$;
+
+-- Hourly OHLC bars for btc_price since a point in time
+create or replace function btc_hourly_bars(since timestamptz default now() - interval '24 hours')
+returns table (
+    hour timestamptz,
+    open double precision,
+    high double precision,
+    low double precision,
+    close double precision,
+    average double precision,
+    samples bigint
+)
+language sql
+stable
+as $$
+    select
+        date_trunc('hour', p.timestamp) as hour,
+        (array_agg(p.price order by p.timestamp asc))[1] as open,
+        max(p.price) as high,
+        min(p.price) as low,
+        (array_agg(p.price order by p.timestamp desc))[1] as close,
+        avg(p.price) as average,
+        count(*) as samples
+    from btc_price p
+    where p.timestamp >= since
+    group by 1
+    order by 1
+$$;
+
+-- Daily average BTC price for the last n days (including today)
+create or replace function btc_daily_averages(days integer default 7)
+returns table (
+    day date,
+    average double precision,
+    high double precision,
+    low double precision,
+    samples bigint
+)
+language sql
+stable
+as $$
+    select
+        (p.timestamp at time zone 'utc')::date as day,
+        avg(p.price) as average,
+        max(p.price) as high,
+        min(p.price) as low,
+        count(*) as samples
+    from btc_price p
+    where p.timestamp >= date_trunc('day', now() at time zone 'utc') at time zone 'utc' - make_interval(days => days - 1)
+    group by 1
+    order by 1
+$$;
+
+-- Latest BTC price compared with the last price at or before 24 hours earlier
+create or replace function btc_change_since_yesterday()
+returns table (
+    latest_price double precision,
+    latest_at timestamptz,
+    yesterday_price double precision,
+    yesterday_at timestamptz,
+    change double precision,
+    change_pct double precision
+)
+language sql
+stable
+as $$
+    with latest as (
+        select price, timestamp from btc_price order by timestamp desc limit 1
+    ),
+    yesterday as (
+        select p.price, p.timestamp
+        from btc_price p, latest l
+        where p.timestamp <= l.timestamp - interval '24 hours'
+        order by p.timestamp desc
+        limit 1
+    )
+    select
+        l.price,
+        l.timestamp,
+        y.price,
+        y.timestamp,
+        l.price - y.price,
+        case when y.price is null or y.price = 0 then null else (l.price - y.price) / y.price * 100 end
+    from latest l
+    left join yesterday y on true
+$$;
+
+-- The most recent news items for each topic
+create or replace function latest_news_per_topic(per_topic integer default 3)
+returns table (
+    topic text,
+    id bigint,
+    "timestamp" timestamptz,
+    finance_info text
+)
+language sql
+stable
+as $$
+    select ranked.topic, ranked.id, ranked.timestamp, ranked.finance_info
+    from (
+        select
+            news_topic(e.finance_info::text) as topic,
+            e.id::bigint as id,
+            e.timestamp,
+            e.finance_info::text as finance_info,
+            row_number() over (partition by news_topic(e.finance_info::text) order by e.timestamp desc, e.id desc) as rank
+        from eco_info e
+    ) ranked
+    where ranked.rank <= per_topic
+    order by ranked.topic, ranked.timestamp desc
+$$;
+
+-- Number of news items per topic per day since a point in time
+create or replace function news_counts_per_topic(since timestamptz default now() - interval '7 days')
+returns table (
+    day date,
+    topic text,
+    items bigint
+)
+language sql
+stable
+as $$
+    select
+        (e.timestamp at time zone 'utc')::date as day,
+        news_topic(e.finance_info::text) as topic,
+        count(*) as items
+    from eco_info e
+    where e.timestamp >= since
+    group by 1, 2
+    order by 1, 2
+$$;
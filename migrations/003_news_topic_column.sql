@@ -0,0 +1,54 @@
+-- Store each eco_info row's topic instead of recomputing news_topic() on every read.
+-- Requires migrations/002_aggregation_functions.sql for news_topic(). Adding the column
+-- computes the topic of every existing row once; new rows get theirs on insert.
+
+alter table eco_info add column if not exists topic text
+    generated always as (news_topic(finance_info::text)) stored;
+
+-- Serves the per-topic "latest n" scans below and the time-bounded counts
+create index if not exists eco_info_topic_timestamp_idx on eco_info (topic, timestamp desc, id desc);
+create index if not exists eco_info_timestamp_idx on eco_info (timestamp);
+
+-- The most recent news items for each topic: one short index scan per topic
+create or replace function latest_news_per_topic(per_topic integer default 3)
+returns table (
+    topic text,
+    id bigint,
+    "timestamp" timestamptz,
+    finance_info text
+)
+language sql
+stable
+as $$
+    select topics.topic, latest.id::bigint, latest.timestamp, latest.finance_info::text
+    -- Every value news_topic() can return
+    from (values ('crypto'), ('macro'), ('other')) as topics (topic)
+    cross join lateral (
+        select e.id, e.timestamp, e.finance_info
+        from eco_info e
+        where e.topic = topics.topic
+        order by e.timestamp desc, e.id desc
+        limit per_topic
+    ) latest
+    order by topics.topic, latest.timestamp desc
+$$;
+
+-- Number of news items per topic per day since a point in time
+create or replace function news_counts_per_topic(since timestamptz default now() - interval '7 days')
+returns table (
+    day date,
+    topic text,
+    items bigint
+)
+language sql
+stable
+as $$
+    select
+        (e.timestamp at time zone 'utc')::date as day,
+        e.topic,
+        count(*) as items
+    from eco_info e
+    where e.timestamp >= since
+    group by 1, 2
+    order by 1, 2
+$$;
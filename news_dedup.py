@@ -0,0 +1,124 @@
+import re
+import math
+import hashlib
+from collections import deque, defaultdict
+
+
+TAG_RE = re.compile(r'<[^>]+>')
+TOKEN_RE = re.compile(r'[a-z0-9$%.]+')
+
+SIGNATURE_BITS = 128
+BANDS = 16
+BAND_BITS = SIGNATURE_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=16).digest(), 'big')
+
+
+def tokenize(text: str) -> list:
+    """Lowercase, strip HTML tags and split a news description into tokens"""
+    text = TAG_RE.sub(' ', text or '').lower()
+    return [token.strip('.') for token in TOKEN_RE.findall(text) if token.strip('.')]
+
+
+def embed(text: str) -> dict:
+    """Hashed word unigram + bigram vector, L2-normalized, as {feature_hash: weight}"""
+    tokens = tokenize(text)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    vector = defaultdict(float)
+    for feature in features:
+        vector[_feature_hash(feature)] += 1.0
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if not norm:
+        return {}
+    return {key: weight / norm for key, weight in vector.items()}
+
+
+def cosine(a: dict, b: dict) -> float:
+    """Cosine similarity of two normalized sparse vectors"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(key, 0.0) for key, weight in a.items())
+
+
+def signature(vector: dict) -> int:
+    """SimHash signature: each bit is the sign of a random hyperplane projection"""
+    sums = [0.0] * SIGNATURE_BITS
+    for key, weight in vector.items():
+        # The feature hash doubles as its random +/-1 projection on every hyperplane
+        for bit in range(SIGNATURE_BITS):
+            if (key >> bit) & 1:
+                sums[bit] += weight
+            else:
+                sums[bit] -= weight
+    result = 0
+    for bit, total in enumerate(sums):
+        if total > 0:
+            result |= 1 << bit
+    return result
+
+
+class NewsDedupIndex:
+    """Approximate nearest-neighbour index over the most recent news items"""
+
+    def __init__(self, capacity: int = 500, threshold: float = 0.85):
+        self.capacity = capacity
+        self.threshold = threshold
+        # Item ids in insertion order, and id -> (text, vector, signature)
+        self.items = deque()
+        self.entries = {}
+        self.next_id = 0
+        # LSH buckets keyed by (band, band value) -> item ids
+        self.buckets = defaultdict(set)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _band_keys(self, sig: int):
+        for band in range(BANDS):
+            yield band, (sig >> (band * BAND_BITS)) & BAND_MASK
+
+    def add(self, text: str, vector: dict = None, sig: int = None):
+        """Index a news item, evicting the oldest once over capacity.
+
+        vector and sig can be passed in when the caller already computed them for find_duplicate.
+        """
+        vector = embed(text) if vector is None else vector
+        if not vector:
+            return
+        sig = signature(vector) if sig is None else sig
+        item_id = self.next_id
+        self.next_id += 1
+        self.items.append(item_id)
+        self.entries[item_id] = (text, vector, sig)
+        for key in self._band_keys(sig):
+            self.buckets[key].add(item_id)
+
+        if len(self.items) > self.capacity:
+            old_id = self.items.popleft()
+            _, _, old_sig = self.entries.pop(old_id)
+            for key in self._band_keys(old_sig):
+                bucket = self.buckets[key]
+                bucket.discard(old_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def find_duplicate(self, text: str, vector: dict = None, sig: int = None):
+        """Return (text, similarity) of the closest indexed item above threshold, else None"""
+        vector = embed(text) if vector is None else vector
+        if not vector:
+            return None
+        sig = signature(vector) if sig is None else sig
+        candidates = set()
+        for key in self._band_keys(sig):
+            candidates.update(self.buckets.get(key, ()))
+
+        best = None
+        for item_id in candidates:
+            indexed_text, indexed_vector, _ = self.entries[item_id]
+            similarity = cosine(vector, indexed_vector)
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (indexed_text, similarity)
+        return best
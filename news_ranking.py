@@ -0,0 +1,92 @@
+import math
+import time
+from news_dedup import embed, cosine, tokenize
+from records import NewsRecord
+
+
+# Keyword weights for macro and crypto terms; a story's weight grows with the terms it mentions.
+# news_topic() in migrations/002_aggregation_functions.sql repeats these lists for server-side topics.
+MACRO_TERMS = {
+    'fed': 2.0, 'federal': 1.0, 'fomc': 2.5, 'powell': 1.5, 'rate': 1.5, 'rates': 1.5,
+    'inflation': 2.0, 'cpi': 2.5, 'pce': 2.0, 'gdp': 2.0, 'recession': 2.0, 'jobs': 1.5,
+    'payrolls': 2.0, 'unemployment': 1.5, 'treasury': 1.5, 'yields': 1.5, 'tariff': 1.5,
+    'tariffs': 1.5, 'ecb': 1.5, 'dollar': 1.0, 'stocks': 1.0, 'markets': 0.5
+}
+CRYPTO_TERMS = {
+    'bitcoin': 2.5, 'btc': 2.5, 'crypto': 1.5, 'cryptocurrency': 1.5, 'etf': 2.0, 'etfs': 2.0,
+    'halving': 2.0, 'sec': 1.5, 'stablecoin': 1.5, 'ethereum': 1.0, 'blackrock': 1.0,
+    'mining': 1.0, 'miners': 1.0, 'regulation': 1.0, 'inflows': 1.5, 'outflows': 1.5
+}
+
+
+class ScoredNews:
+    """A news record with its ranking features"""
+
+    __slots__ = ('record', 'score', 'topic', 'vector', 'cluster_size')
+
+    def __init__(self, record: NewsRecord, score: float, topic: str, vector: dict):
+        self.record = record
+        self.score = score
+        self.topic = topic
+        self.vector = vector
+        self.cluster_size = 1
+
+
+class NewsRanker:
+    """Score, cluster and select the most relevant news items for the email prompt"""
+
+    def __init__(self,
+                 half_life_hours: float = 24.0,
+                 cluster_threshold: float = 0.5,
+                 diversity_penalty: float = 0.3):
+        self.decay = math.log(2) / half_life_hours
+        self.cluster_threshold = cluster_threshold
+        self.diversity_penalty = diversity_penalty
+
+    def score(self, text: str, timestamp: float, now: float):
+        """Return (score, topic) from recency decay and keyword weights"""
+        tokens = set(tokenize(text))
+        macro = sum(weight for term, weight in MACRO_TERMS.items() if term in tokens)
+        crypto = sum(weight for term, weight in CRYPTO_TERMS.items() if term in tokens)
+        age_hours = max((now - timestamp) / 3600, 0.0)
+        recency = math.exp(-self.decay * age_hours)
+        topic = 'crypto' if crypto > macro else 'macro' if macro else 'other'
+        return recency * (1.0 + macro + crypto), topic
+
+    def cluster(self, items: list) -> list:
+        """Greedy leader clustering: highest-scored item of each cluster is its representative"""
+        representatives = []
+        for item in sorted(items, key=lambda scored: scored.score, reverse=True):
+            for leader in representatives:
+                if cosine(item.vector, leader.vector) >= self.cluster_threshold:
+                    # Related coverage reinforces the story without adding another prompt entry
+                    leader.cluster_size += 1
+                    leader.score += item.score * 0.25
+                    break
+            else:
+                representatives.append(item)
+        return representatives
+
+    def select(self, representatives: list, top_k: int) -> list:
+        """Pick top_k representatives, discounting topics that are already covered"""
+        remaining = list(representatives)
+        selected = []
+        topic_counts = {}
+        while remaining and len(selected) < top_k:
+            best = max(remaining, key=lambda item: item.score * (1 - self.diversity_penalty) ** topic_counts.get(item.topic, 0))
+            remaining.remove(best)
+            selected.append(best)
+            topic_counts[best.topic] = topic_counts.get(best.topic, 0) + 1
+        return selected
+
+    def rank(self, records: list[NewsRecord], top_k: int = 10, now: float = None) -> list[str]:
+        """Return the top_k news texts from eco_info records, most relevant first"""
+        now = time.time() if now is None else now
+        items = []
+        for record in records:
+            if not record.finance_info.strip():
+                continue
+            score, topic = self.score(record.finance_info, record.timestamp, now)
+            items.append(ScoredNews(record, score, topic, embed(record.finance_info)))
+
+        return [item.record.finance_info for item in self.select(self.cluster(items), top_k)]
@@ -0,0 +1,215 @@
+import math
+import time
+from collections import deque
+from datetime import datetime, timezone
+from config import get_settings
+from clients import get_http_session
+from email_delivery import post_mailgun
+
+
+class RollingStats:
+    """Fixed-size rolling window with O(1) mean/std updates"""
+
+    def __init__(self, size: int):
+        if size < 2:
+            raise ValueError("Rolling window size must be at least 2")
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, value: float):
+        # Evict the oldest value from the running sums before deque drops it
+        if len(self.values) == self.size:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.size
+
+    @property
+    def oldest(self):
+        return self.values[0] if self.values else None
+
+    def mean(self) -> float:
+        return self.total / len(self.values) if self.values else 0.0
+
+    def std(self) -> float:
+        n = len(self.values)
+        if n < 2:
+            return 0.0
+        # Sample variance from running sums, clamped against float drift
+        variance = (self.total_sq - self.total * self.total / n) / (n - 1)
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+
+class PriceAlert:
+    """A single alert raised by the engine"""
+
+    def __init__(self, kind: str, price: float, value: float, threshold: float, message: str):
+        self.kind = kind
+        self.price = price
+        self.value = value
+        self.threshold = threshold
+        self.message = message
+        self.timestamp = datetime.now(timezone.utc).isoformat()
+
+    def __repr__(self):
+        return f"PriceAlert({self.kind}: {self.message})"
+
+
+class PriceAlertEngine:
+    """Evaluate each new BTC sample against percent-move, z-score and volatility rules.
+
+    Returns are scaled to a one-minute horizon (random-walk sqrt-time scaling) and the
+    percent move is measured over move_window_seconds, so the rules mean the same thing
+    whether samples arrive every 15 seconds or every 5 minutes.
+    """
+
+    def __init__(self,
+                 window: int = 60,
+                 move_window_seconds: float = 3600,
+                 move_threshold_pct: float = 10.0,
+                 zscore_threshold: float = 5.0,
+                 volatility_multiplier: float = 3.0,
+                 recent_window: int = 5,
+                 cooldown_seconds: float = 3600,
+                 notifier=None):
+        self.move_window_seconds = move_window_seconds
+        # (timestamp, price) samples inside the move window, oldest first
+        self.prices = deque()
+        self.returns = RollingStats(window)
+        self.recent_returns = RollingStats(recent_window)
+        self.move_threshold_pct = move_threshold_pct
+        self.zscore_threshold = zscore_threshold
+        self.volatility_multiplier = volatility_multiplier
+        self.cooldown_seconds = cooldown_seconds
+        self.notifier = notifier
+        self.last_price = None
+        self.last_time = None
+        # Per alert kind: (last fire time, direction) used for cooldown and dedup
+        self.last_fired = {}
+
+    def seed(self, samples):
+        """Warm the windows with historical (price, epoch seconds) samples, oldest first, without alerting"""
+        for price, timestamp in samples:
+            self._push(float(price), timestamp)
+
+    def _return(self, price: float, now: float) -> float:
+        """Return since the last sample, scaled to one minute"""
+        minutes = max((now - self.last_time) / 60, 1 / 60)
+        return (price - self.last_price) / self.last_price / math.sqrt(minutes)
+
+    def _push(self, price: float, now: float):
+        if self.last_price:
+            ret = self._return(price, now)
+            self.returns.push(ret)
+            self.recent_returns.push(ret)
+        self.prices.append((now, price))
+        while now - self.prices[0][0] > self.move_window_seconds:
+            self.prices.popleft()
+        self.last_price = price
+        self.last_time = now
+
+    def evaluate(self, price: float, now: float) -> list:
+        """Return the alerts triggered by a new price, before it enters the windows"""
+        alerts = []
+
+        # Percent move across the move window
+        if self.prices:
+            started_at, oldest = self.prices[0]
+            move_pct = (price - oldest) / oldest * 100
+            if abs(move_pct) >= self.move_threshold_pct:
+                alerts.append(PriceAlert(
+                    'move', price, move_pct, self.move_threshold_pct,
+                    f"BTC moved {move_pct:+.2f}% over the last {(now - started_at) / 60:.0f} minutes "
+                    f"(${oldest:,.2f} -> ${price:,.2f})"))
+
+        # The return rules need a full window; a cold window's std is mostly noise
+        if self.last_price and self.returns.full:
+            ret = self._return(price, now)
+
+            # Z-score of the new return against the rolling return distribution
+            returns_std = self.returns.std()
+            if returns_std > 0:
+                zscore = (ret - self.returns.mean()) / returns_std
+                if abs(zscore) >= self.zscore_threshold:
+                    alerts.append(PriceAlert(
+                        'zscore', price, zscore, self.zscore_threshold,
+                        f"BTC moved {(price - self.last_price) / self.last_price * 100:+.2f}% since the last sample, "
+                        f"{zscore:+.2f} standard deviations from its recent per-minute returns"))
+
+            # Realized volatility of the last few returns (this one included) against the window
+            if returns_std > 0:
+                recent = list(self.recent_returns.values)[1:] + [ret]
+                ratio = math.sqrt(sum(r * r for r in recent) / len(recent)) / returns_std
+                if ratio >= self.volatility_multiplier:
+                    alerts.append(PriceAlert(
+                        'volatility', price, ratio, self.volatility_multiplier,
+                        f"BTC volatility spike: the last {self.recent_returns.size} samples are "
+                        f"{ratio:.1f}x as volatile as the last {self.returns.size}"))
+
+        return alerts
+
+    def _should_fire(self, alert: PriceAlert, now: float) -> bool:
+        direction = 1 if alert.value >= 0 else -1
+        previous = self.last_fired.get(alert.kind)
+        if previous:
+            fired_at, previous_direction = previous
+            # Same kind in the same direction inside the cooldown is a duplicate
+            if now - fired_at < self.cooldown_seconds and direction == previous_direction:
+                return False
+        self.last_fired[alert.kind] = (now, direction)
+        return True
+
+    def update(self, price: float, now: float = None) -> list:
+        """Process one sample: evaluate, dedup, notify and roll the windows forward"""
+        if price is None:
+            return []
+        price = float(price)
+        now = time.time() if now is None else now
+
+        fired = [alert for alert in self.evaluate(price, now) if self._should_fire(alert, now)]
+        self._push(price, now)
+
+        if fired:
+            for alert in fired:
+                print(f"Price alert: {alert.message}")
+            if self.notifier:
+                try:
+                    self.notifier(fired)
+                except Exception as e:
+                    print(f"Error sending price alert: {type(e).__name__} - {str(e)}")
+        return fired
+
+
+class MailgunAlertNotifier:
+    """Send alerts straight through Mailgun to RECIPIENT_EMAIL.
+
+    Settings are checked on construction so a watch deployment without Mailgun
+    configuration fails at start-up instead of dropping alerts when they fire.
+    """
+
+    def __init__(self):
+        self.settings = get_settings().require('mailgun_api_key', 'mailgun_domain', 'mailgun_from_email',
+                                               'recipient_email')
+        self.http = get_http_session('mailgun')
+
+    def __call__(self, alerts: list) -> bool:
+        kinds = ', '.join(alert.kind for alert in alerts)
+        lines = [f"- {alert.message}" for alert in alerts]
+        lines.extend(["", f"Price: ${alerts[0].price:,.2f} USD", f"Time: {alerts[0].timestamp}"])
+        response = post_mailgun(self.http, self.settings, list(self.settings.recipient_email),
+                                f"BTC Price Alert - {kinds}", '\n'.join(lines))
+        if response.status_code != 200:
+            raise Exception(f"Mailgun returned {response.status_code}: {response.text}")
+        print(f"Price alert sent to {len(self.settings.recipient_email)} recipients")
+        return True
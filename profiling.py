@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import time
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+
+# A sample counts as network wait when one of its innermost frames is in these files
+NETWORK_MARKERS = (
+    f"{os.sep}socket.py",
+    f"{os.sep}ssl.py",
+    f"{os.sep}selectors.py",
+    f"{os.sep}http{os.sep}client.py",
+    f"httpcore{os.sep}_backends",
+    f"urllib3{os.sep}util{os.sep}connection.py",
+)
+IMPORT_MARKER = 'importlib._bootstrap'
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _classify(frames, on_cpu) -> str:
+    """Category of a main-thread sample from its frames (innermost first) and whether the thread was running.
+
+    Off-CPU time in socket code is network wait; other off-CPU time (time.sleep, Event.wait,
+    lock acquires and other blocking C calls) is idle. on_cpu is None where the thread's CPU
+    clock is unavailable, and socket frames alone then decide.
+    """
+    if on_cpu:
+        return 'cpu'
+    for frame in frames[:4]:
+        if any(marker in frame.f_code.co_filename for marker in NETWORK_MARKERS):
+            return 'network'
+    return 'cpu' if on_cpu is None else 'idle'
+
+
+def _in_import(frames) -> bool:
+    return any(IMPORT_MARKER in frame.f_code.co_filename for frame in frames)
+
+
+def _thread_cpu_clock(thread_id: int):
+    """A clock measuring another thread's CPU time, or None where the platform has none"""
+    try:
+        return time.pthread_getcpuclockid(thread_id)
+    except (AttributeError, OSError):
+        return None
+
+
+def _startup_seconds():
+    """Seconds since this process started (interpreter start-up plus top-level imports), Linux only"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the command name; starttime is field 22 of the whole line
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK'), 0.0)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RunProfiler:
+    """Sampling CPU profile, wall-clock breakdown and top allocations for one agent run.
+
+    Writes <name>-<timestamp>.collapsed (flame graph input for flamegraph.pl or
+    speedscope) and <name>-<timestamp>.json into output_dir.
+    """
+
+    def __init__(self, name: str, output_dir: str = 'profiles', interval: float = 0.005, top_allocations: int = 25):
+        self.name = name
+        self.output_dir = output_dir
+        self.interval = interval
+        self.top_allocations = top_allocations
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.category_seconds = Counter()
+        self.import_seconds = 0.0
+        self.samples = 0
+        self.sampler_cpu = 0.0
+        self.main_id = threading.main_thread().ident
+        self.main_clock = _thread_cpu_clock(self.main_id)
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def _main_cpu(self):
+        return time.clock_gettime(self.main_clock) if self.main_clock is not None else None
+
+    def _sample(self):
+        sampler_id = threading.get_ident()
+        main_id = self.main_id
+        names = {}
+        last_wall = time.perf_counter()
+        last_cpu = self._main_cpu()
+        while not self.stopping.wait(self.interval):
+            # Samples are weighted by the wall time since the previous one, since the sampler
+            # needs the GIL and wakes less often while the main thread is busy in Python
+            wall = time.perf_counter()
+            elapsed, last_wall = wall - last_wall, wall
+            # The main thread counts as running when it used at least half of that time on CPU
+            on_cpu = None
+            if last_cpu is not None:
+                cpu = self._main_cpu()
+                on_cpu = (cpu - last_cpu) >= 0.5 * elapsed
+                last_cpu = cpu
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_id:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(frame)
+                    frame = frame.f_back
+                stack = ';'.join([names.get(thread_id, str(thread_id))] + [_frame_label(f) for f in reversed(frames)])
+                self.stacks[stack] += 1
+                if thread_id == main_id:
+                    self.samples += 1
+                    category = _classify(frames, on_cpu)
+                    self.categories[category] += 1
+                    self.category_seconds[category] += elapsed
+                    if _in_import(frames):
+                        self.import_seconds += elapsed
+        # The sampler's own frame walking is excluded from the run's CPU time
+        self.sampler_cpu = time.thread_time()
+
+    def __enter__(self):
+        self.startup = _startup_seconds()
+        tracemalloc.start()
+        self.started_at = datetime.now(timezone.utc)
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.main_cpu_start = self._main_cpu()
+        self.thread = threading.Thread(target=self._sample, name='profiler-sampler', daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        main_cpu = self._main_cpu()
+        self.stopping.set()
+        self.thread.join()
+        cpu = max(cpu - self.sampler_cpu, 0.0)
+        # Without a per-thread clock the main thread's CPU time comes from its samples
+        main_cpu = main_cpu - self.main_cpu_start if main_cpu is not None else self.category_seconds['cpu']
+
+        # Leave out what the profiler itself allocated (sampled stacks, tracemalloc bookkeeping)
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        current = sum(stat.size for stat in snapshot.statistics('filename'))
+        self.write(wall, main_cpu, cpu, snapshot, current, peak)
+        return False
+
+    def breakdown(self, wall: float, main_cpu: float, process_cpu: float) -> dict:
+        """Wall-clock split of the main thread: its CPU time, network wait, idle time and the rest.
+
+        main_thread_cpu_seconds comes from the main thread's CPU clock and the waits from its
+        off-CPU samples, so the four parts add up to about wall_seconds. import_seconds is the share
+        of that time spent importing, and overlaps the other parts. process_cpu_seconds covers
+        all threads except the sampler and can exceed wall_seconds in threaded runs.
+        startup_seconds covers everything before the profiler started, including the entry
+        point's top-level imports.
+        """
+        network = self.category_seconds['network']
+        idle = self.category_seconds['idle']
+        return {
+            'wall_seconds': round(wall, 4),
+            'main_thread_cpu_seconds': round(main_cpu, 4),
+            'network_wait_seconds': round(network, 4),
+            'idle_seconds': round(idle, 4),
+            'other_wait_seconds': round(max(wall - main_cpu - network - idle, 0.0), 4),
+            'import_seconds': round(self.import_seconds, 4),
+            'process_cpu_seconds': round(process_cpu, 4),
+            'sampler_cpu_seconds': round(self.sampler_cpu, 4),
+            'startup_seconds': round(self.startup, 4) if self.startup is not None else None,
+            'main_thread_samples': self.samples,
+            'sample_categories': dict(self.categories)
+        }
+
+    def top_functions(self, limit: int = 25) -> list:
+        """Functions by self samples (innermost frame) across all threads"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return [{'function': name, 'samples': count} for name, count in leaves.most_common(limit)]
+
+    def write(self, wall: float, main_cpu: float, process_cpu: float, snapshot, current: int, peak: int):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{self.name}-{self.started_at.strftime('%Y%m%dT%H%M%SZ')}")
+
+        with open(base + '.collapsed', 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        allocations = [{
+            'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            'size_kb': round(stat.size / 1024, 1),
+            'count': stat.count
+        } for stat in snapshot.statistics('lineno')[:self.top_allocations]]
+
+        report = {
+            'name': self.name,
+            'started_at': self.started_at.isoformat(),
+            'argv': sys.argv,
+            'sample_interval_seconds': self.interval,
+            'timing': self.breakdown(wall, main_cpu, process_cpu),
+            'top_functions': self.top_functions(),
+            'memory': {
+                'traced_current_kb': round(current / 1024, 1),
+                # tracemalloc only tracks the peak as a whole, so it includes the profiler's own memory
+                'traced_peak_kb': round(peak / 1024, 1),
+                'top_allocations': allocations
+            }
+        }
+        with open(base + '.json', 'w') as f:
+            json.dump(report, f, indent=2)
+
+        timing = report['timing']
+        print(f"Profile written to {base}.json and {base}.collapsed "
+              f"(wall {timing['wall_seconds']:.2f}s, main-thread cpu {timing['main_thread_cpu_seconds']:.2f}s, "
+              f"network {timing['network_wait_seconds']:.2f}s, idle {timing['idle_seconds']:.2f}s, "
+              f"import {timing['import_seconds']:.2f}s, process cpu {timing['process_cpu_seconds']:.2f}s)")
+
+
+def profile_run(name: str, enabled: bool):
+    """RunProfiler when enabled, otherwise a no-op context manager"""
+    return RunProfiler(name) if enabled else nullcontext()
@@ -0,0 +1,30 @@
+import time
+import threading
+
+
+class RateLimiter:
+    """Thread-safe rate limiter shared by worker threads.
+
+    Each wait() reserves the next slot of a token bucket refilled at rate_per_second
+    and holding up to burst tokens, then sleeps until that slot. With the default
+    burst of 1, calls are spaced evenly at 1 / rate_per_second.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        self.interval = 1.0 / rate_per_second
+        self.burst = max(1, burst)
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, calls_per_minute: float, burst: int = 1) -> 'RateLimiter':
+        return cls(calls_per_minute / 60.0, burst)
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            # next_slot runs ahead of now by the calls already reserved; up to burst of them go at once
+            slot = max(now, self.next_slot - (self.burst - 1) * self.interval)
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if slot > now:
+            time.sleep(slot - now)
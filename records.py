@@ -0,0 +1,125 @@
+import io
+import re
+import csv
+import json
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+
+# Postgres text output uses short offsets (+00) and trims fraction zeros, which
+# datetime.fromisoformat only accepts from Python 3.11
+_FRACTION = re.compile(r'\.(\d{1,6})\d*')
+_SHORT_OFFSET = re.compile(r'([+-]\d{2})$')
+
+
+def _normalize_iso(timestamp: str) -> str:
+    timestamp = timestamp.replace('Z', '+00:00')
+    timestamp = _FRACTION.sub(lambda m: '.' + m.group(1).ljust(6, '0'), timestamp, count=1)
+    if len(timestamp) <= 10:
+        # Date only, where the trailing -DD is not an offset
+        return timestamp
+    return _SHORT_OFFSET.sub(r'\1:00', timestamp)
+
+
+def to_epoch(timestamp) -> float:
+    """Convert a Supabase ISO timestamp to epoch seconds (naive values are UTC)"""
+    parsed = datetime.fromisoformat(_normalize_iso(str(timestamp)))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def to_iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+@dataclass(slots=True)
+class NewsRecord:
+    """One eco_info row"""
+    id: int
+    timestamp: float
+    finance_info: str
+
+
+def _news_record(news_id, timestamp, text):
+    """NewsRecord for one row, or None when the row has no text or a bad timestamp"""
+    if text is not None and not isinstance(text, str):
+        # finance_info may already be stored as JSON
+        text = json.dumps(text)
+    if not text:
+        return None
+    try:
+        return NewsRecord(news_id, to_epoch(timestamp), text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _csv_rows(body: str):
+    """Iterate the data rows of a PostgREST text/csv body as lists, header first"""
+    if not body:
+        return iter(())
+    return csv.reader(io.StringIO(body))
+
+
+def parse_news_csv(body: str) -> list[NewsRecord]:
+    """Build NewsRecords from a text/csv response (id, timestamp, finance_info) without row dicts"""
+    rows = _csv_rows(body)
+    header = next(rows, None)
+    if not header:
+        return []
+    id_col, ts_col, text_col = header.index('id'), header.index('timestamp'), header.index('finance_info')
+    records = []
+    for row in rows:
+        news_id = row[id_col]
+        record = _news_record(int(news_id) if news_id.isdigit() else news_id, row[ts_col], row[text_col])
+        if record:
+            records.append(record)
+    return records
+
+
+class PriceSeries:
+    """btc_price rows stored column-wise in two double arrays"""
+
+    __slots__ = ('prices', 'timestamps')
+
+    def __init__(self):
+        self.prices = array('d')
+        self.timestamps = array('d')
+
+    @classmethod
+    def from_csv(cls, body: str) -> 'PriceSeries':
+        """Build a series from a text/csv response (price, timestamp) without row dicts"""
+        series = cls()
+        rows = _csv_rows(body)
+        header = next(rows, None)
+        if not header:
+            return series
+        price_col, ts_col = header.index('price'), header.index('timestamp')
+        for row in rows:
+            try:
+                series.append(float(row[price_col]), to_epoch(row[ts_col]))
+            except (IndexError, ValueError):
+                pass
+        return series
+
+    def append(self, price: float, timestamp: float):
+        self.prices.append(price)
+        self.timestamps.append(timestamp)
+
+    def __len__(self):
+        return len(self.prices)
+
+    def __iter__(self):
+        return zip(self.prices, self.timestamps)
+
+    @property
+    def latest(self):
+        """Most recent price by timestamp, or None when empty"""
+        if not self.prices:
+            return None
+        return self.prices[max(range(len(self.timestamps)), key=self.timestamps.__getitem__)]
+
+    def to_prompt(self) -> list[dict]:
+        """Price points in the shape used by the email prompt"""
+        return [{'price': price, 'timestamp': to_iso(timestamp)} for price, timestamp in self]
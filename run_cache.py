@@ -0,0 +1,55 @@
+import os
+import json
+import math
+import hashlib
+from datetime import datetime, timezone
+
+
+def price_bucket(price: float, tolerance_pct: float) -> int:
+    """Log-scale bucket so prices within roughly tolerance_pct of each other share a bucket"""
+    if not price or price <= 0:
+        return 0
+    if tolerance_pct <= 0:
+        return hash(price)
+    return math.floor(math.log(price) / math.log1p(tolerance_pct / 100))
+
+
+def fingerprint(news: list, latest_price: float, tolerance_pct: float) -> str:
+    """Hash of the news record IDs plus the bucketed latest BTC price"""
+    digest = hashlib.sha256()
+    for news_id in sorted(str(record.id) for record in news):
+        digest.update(news_id.encode())
+        digest.update(b',')
+    digest.update(f"|{price_bucket(latest_price, tolerance_pct)}".encode())
+    return digest.hexdigest()
+
+
+class DigestCache:
+    """The last generated email and the fingerprint of the data it was generated from"""
+
+    def __init__(self, path: str = '.digest_cache.json'):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def lookup(self, key: str):
+        """Return the cached content for a fingerprint, or None"""
+        entry = self.load()
+        if entry and entry.get('fingerprint') == key:
+            return entry.get('content')
+        return None
+
+    def store(self, key: str, content: str):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'fingerprint': key,
+                'content': content,
+                'created_at': datetime.now(timezone.utc).isoformat()
+            }, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _value(value) -> str:
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def _quote(value) -> str:
+    # PostgREST logic-tree values containing reserved characters must be double quoted
+    return '"' + _value(value).replace('"', '\\"') + '"'
+
+
+def iter_pages(client,
+               table: str,
+               columns: str = '*',
+               page_size: int = 1000,
+               order_column: str = 'timestamp',
+               tiebreak_column: str = 'id',
+               start=None,
+               end=None,
+               prefetch: bool = True):
+    """Yield pages of rows ordered by (order_column, tiebreak_column) using keyset pagination.
+
+    The next page is requested on a background thread while the caller works on the
+    current one, so at most two pages are held in memory regardless of table size.
+    Only an empty page ends the scan, since PostgREST caps each response at its
+    max-rows setting and a short page may just be a page_size above that cap.
+    start is inclusive and end is exclusive, both compared against order_column.
+    """
+    if columns != '*':
+        # The keyset columns must come back with every row
+        selected = [column.strip() for column in columns.split(',')]
+        for column in (order_column, tiebreak_column):
+            if column and column not in selected:
+                selected.append(column)
+        columns = ', '.join(selected)
+
+    def fetch(last_row):
+        query = client.table(table).select(columns)
+        if last_row is None:
+            if start is not None:
+                query = query.gte(order_column, _value(start))
+        else:
+            last_value = last_row[order_column]
+            if tiebreak_column:
+                query = query.or_(
+                    f"{order_column}.gt.{_quote(last_value)},"
+                    f"and({order_column}.eq.{_quote(last_value)},{tiebreak_column}.gt.{_quote(last_row[tiebreak_column])})"
+                )
+            else:
+                query = query.gt(order_column, _value(last_value))
+        if end is not None:
+            query = query.lt(order_column, _value(end))
+        query = query.order(order_column)
+        if tiebreak_column:
+            query = query.order(tiebreak_column)
+        return query.limit(page_size).execute().data
+
+    if not prefetch:
+        last_row = None
+        while True:
+            page = fetch(last_row)
+            if not page:
+                return
+            yield page
+            last_row = page[-1]
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(fetch, None)
+        while True:
+            page = future.result()
+            if not page:
+                return
+            # Start the next request before handing this page to the caller
+            future = executor.submit(fetch, page[-1])
+            yield page
+
+
+def iter_rows(client, table: str, **kwargs):
+    """Yield rows one at a time; see iter_pages for the arguments"""
+    for page in iter_pages(client, table, **kwargs):
+        yield from page
@@ -0,0 +1,66 @@
+from datetime import datetime, timezone, timedelta
+from email.utils import format_datetime
+
+import requests
+
+import btc_backfill
+from btc_backfill import BTCBackfill, retry_after
+from rate_limit import RateLimiter
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload or {}
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code))
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+
+    def get(self, *args, **kwargs):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def make_backfill(session):
+    backfill = BTCBackfill.__new__(BTCBackfill)
+    backfill.coingecko_key = None
+    backfill.rate_limiter = RateLimiter(1000)
+    backfill.session = session
+    return backfill
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert retry_after('7', 5) == 7.0
+    assert retry_after(None, 5) == 5
+    assert retry_after('not a date', 5) == 5
+    when = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= retry_after(when, 5) <= 30
+
+
+def test_fetch_chunk_retries_transient_errors(monkeypatch):
+    sleeps = []
+    # The rate limiter's own sub-second waits are not backoff
+    monkeypatch.setattr(btc_backfill.time, 'sleep', lambda seconds: seconds >= 1 and sleeps.append(seconds))
+    when = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    session = FakeSession([
+        requests.ConnectionError("reset"),
+        requests.Timeout("slow"),
+        FakeResponse(429, headers={'Retry-After': when}),
+        FakeResponse(200, {'prices': [[1, 2.0]]})
+    ])
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert make_backfill(session).fetch_chunk(start, start + timedelta(days=1)) == [[1, 2.0]]
+    assert sleeps[:2] == [5, 10]
+    assert 25 <= sleeps[2] <= 30
@@ -0,0 +1,34 @@
+from btc_scheduler import AdaptiveScheduler
+
+
+def make_scheduler(**kwargs):
+    # Volatility thresholds out of reach so only the move rule applies
+    return AdaptiveScheduler(min_interval=15, initial_interval=60, fast_volatility_pct=100,
+                             calm_volatility_pct=0, **kwargs)
+
+
+def test_move_threshold_is_per_minute():
+    fast = make_scheduler()
+    fast.observe(100_000, now=0)
+    fast.observe(100_600, now=60)
+    assert fast.interval == 30
+    assert round(fast.last_move_pct, 6) == 0.6
+
+    # The same 0.6% over four minutes is 0.3% per minute, under the 0.5% threshold
+    slow = make_scheduler()
+    slow.observe(100_000, now=0)
+    slow.observe(100_600, now=240)
+    assert slow.interval == 60
+    assert round(slow.last_move_pct, 6) == 0.3
+
+
+def test_metrics_report_the_budget_stretched_wait():
+    scheduler = make_scheduler(calls_per_minute=4)
+    scheduler.interval = 15
+    for second in range(4):
+        scheduler.record_request(now=second)
+    metrics = scheduler.metrics(now=10)
+    assert metrics['interval_seconds'] == 15
+    # The budget is spent until the first request leaves the one-minute window at 60s
+    assert metrics['wait_seconds'] == 50
+    assert metrics['samples_per_minute'] == 1.2
@@ -0,0 +1,71 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import email_delivery
+from email_delivery import ParallelMailer, load_recipients
+
+SETTINGS = SimpleNamespace(mailgun_api_url='https://mailgun.test/messages', mailgun_api_key='key',
+                           mailgun_from_email='digest@example.com')
+CONTENT = "Subject: BTC update\nDear Valued Investor,\n\nBTC closed at $95,000."
+
+
+class FakeResponse:
+    status_code = 200
+
+
+class BlockingSession:
+    def __init__(self):
+        self.released = threading.Event()
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def post(self, url, auth=None, data=None, timeout=None):
+        self.released.wait(5)
+        with self.lock:
+            self.sent.append(data)
+        return FakeResponse()
+
+
+class CountingPool(ThreadPoolExecutor):
+    submitted = 0
+
+    def submit(self, *args, **kwargs):
+        CountingPool.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+def test_load_recipients_skips_malformed_numbers(tmp_path):
+    path = tmp_path / 'recipients.csv'
+    path.write_text("email,name,btc_holdings,cost_basis\n"
+                    "a@example.com,Ann,0.5,30000\n"
+                    "b@example.com,Bob,half,30000\n"
+                    "c@example.com,,,\n"
+                    "d@example.com,Dee,1,n/a\n")
+    recipients = load_recipients(str(path))
+    assert [r['email'] for r in recipients] == ['a@example.com', 'c@example.com']
+    assert recipients[0]['btc_holdings'] == 0.5
+    assert recipients[1]['cost_basis'] == 0
+
+
+def test_deliver_bounds_queued_sends(monkeypatch):
+    monkeypatch.setattr(email_delivery, 'ThreadPoolExecutor', CountingPool)
+    CountingPool.submitted = 0
+    mailer = ParallelMailer(SETTINGS, render_workers=1, send_workers=2, rate_per_second=10_000, chunk_size=5)
+    mailer.session = BlockingSession()
+    recipients = [{'email': f"r{i}@example.com", 'name': f"R{i}", 'btc_holdings': 1.0, 'cost_basis': 0}
+                  for i in range(40)]
+
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(mailer.deliver(CONTENT, recipients, 100_000.0)))
+    worker.start()
+    time.sleep(0.5)
+    # Senders are stuck, so deliver stops submitting once the queue is full
+    assert CountingPool.submitted == mailer.max_queued_sends
+    mailer.session.released.set()
+    worker.join(10)
+
+    assert result['sent'] == 40 and result['failed'] == 0
+    assert sorted(data['to'] for data in mailer.session.sent) == sorted(r['email'] for r in recipients)
+    assert 'Dear R7,' in next(data['text'] for data in mailer.session.sent if data['to'] == 'r7@example.com')
@@ -0,0 +1,57 @@
+from news_dedup import NewsDedupIndex, cosine, embed
+
+STORY = ("Bitcoin ETF inflows reached $1.2 billion on Tuesday as BTC held above $95,000, "
+         "with analysts pointing to steady institutional demand ahead of the Fed meeting.")
+REWORDED = ("Bitcoin ETF inflows reached $1.2 billion on Tuesday as BTC held above $95,000, "
+            "with analysts pointing to steady institutional demand ahead of the Fed meeting next week.")
+DISTINCT = ("US consumer prices rose 0.3% in March, and economists now expect the central bank "
+            "to keep interest rates unchanged through the summer.")
+
+
+def test_near_duplicate_above_threshold_is_found():
+    assert cosine(embed(STORY), embed(REWORDED)) >= 0.85
+    index = NewsDedupIndex()
+    index.add(STORY)
+    text, similarity = index.find_duplicate(REWORDED)
+    assert text == STORY
+    assert similarity >= 0.85
+
+
+def test_distinct_story_is_kept():
+    assert cosine(embed(STORY), embed(DISTINCT)) < 0.85
+    index = NewsDedupIndex()
+    index.add(STORY)
+    assert index.find_duplicate(DISTINCT) is None
+
+
+def test_threshold_is_respected():
+    similarity = cosine(embed(STORY), embed(REWORDED))
+    index = NewsDedupIndex(threshold=similarity + 0.01)
+    index.add(STORY)
+    assert index.find_duplicate(REWORDED) is None
+
+
+def test_exact_repeat_is_a_duplicate():
+    index = NewsDedupIndex()
+    index.add(STORY)
+    assert index.find_duplicate(STORY)[1] > 0.999
+
+
+def test_oldest_item_is_evicted_at_capacity():
+    index = NewsDedupIndex(capacity=2)
+    stories = [f"Story {n}: {text}" for n, text in enumerate([STORY, DISTINCT, "Gold and oil slip as the dollar firms"])]
+    for story in stories:
+        index.add(story)
+    assert len(index) == 2
+    assert index.find_duplicate(STORY) is None
+    assert index.find_duplicate(DISTINCT) is not None
+    # Evicted items leave no ids behind in the LSH buckets
+    indexed = {item_id for bucket in index.buckets.values() for item_id in bucket}
+    assert indexed == set(index.items)
+
+
+def test_empty_text_is_ignored():
+    index = NewsDedupIndex()
+    index.add('')
+    assert len(index) == 0
+    assert index.find_duplicate('') is None
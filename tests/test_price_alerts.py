@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+import price_alerts
+from config import Settings
+from price_alerts import MailgunAlertNotifier, PriceAlert, PriceAlertEngine, RollingStats
+
+
+def random_walk(engine, samples, volatility=0.0007, seed=7, start=60000.0, intervals=(60,)):
+    """Feed samples of a Gaussian random walk with per-minute volatility and return every alert fired"""
+    rng = random.Random(seed)
+    price = start
+    now = 0.0
+    fired = []
+    for _ in range(samples):
+        interval = rng.choice(intervals)
+        now += interval
+        price *= 1 + rng.gauss(0, volatility * (interval / 60) ** 0.5)
+        fired.extend(engine.update(price, now=now))
+    return fired, price
+
+
+def test_rolling_stats_matches_window():
+    stats = RollingStats(3)
+    for value in [1, 2, 3, 4, 5]:
+        stats.push(value)
+    assert stats.full
+    assert stats.oldest == 3
+    assert stats.mean() == 4
+    assert abs(stats.std() - 1.0) < 1e-9
+
+
+def test_cold_window_does_not_alert_on_small_moves():
+    engine = PriceAlertEngine()
+    assert engine.update(60000, now=0) == []
+    assert engine.update(60010, now=60) == []
+    assert engine.update(60030, now=120) == []
+
+
+def test_random_walk_does_not_alert():
+    fired, _ = random_walk(PriceAlertEngine(), 2000)
+    assert fired == []
+
+
+def test_random_walk_alerts_stay_rare_across_seeds():
+    fired = []
+    for seed in range(10):
+        fired.extend(random_walk(PriceAlertEngine(), 2000, seed=seed)[0])
+    assert len(fired) <= 2
+
+
+def test_random_walk_with_adaptive_intervals_does_not_alert():
+    fired = []
+    for seed in range(5):
+        fired.extend(random_walk(PriceAlertEngine(), 2000, seed=seed, intervals=(15, 30, 60, 120, 300))[0])
+    assert fired == []
+
+
+def test_sudden_jump_after_warm_window_alerts():
+    engine = PriceAlertEngine()
+    _, price = random_walk(engine, 120)
+    kinds = {alert.kind for alert in engine.update(price * 1.01, now=engine.last_time + 60)}
+    assert {'zscore', 'volatility'} <= kinds
+
+
+def test_move_window_is_time_based():
+    engine = PriceAlertEngine(move_window_seconds=600)
+    engine.update(60000, now=0)
+    engine.update(60000, now=300)
+    # The first sample has left the 10 minute window, so the move is measured from 60000 at t=300
+    assert [alert.kind for alert in engine.update(67000, now=900)] == ['move']
+    engine = PriceAlertEngine(move_window_seconds=600)
+    engine.update(50000, now=0)
+    engine.update(60000, now=300)
+    assert engine.update(61000, now=900) == []
+
+
+def test_large_window_move_alerts_once_per_cooldown():
+    engine = PriceAlertEngine(window=5)
+    for i, price in enumerate([60000, 60000, 60000, 60000, 60000]):
+        engine.update(price, now=i * 60)
+    first = engine.update(67000, now=300)
+    second = engine.update(68000, now=360)
+    assert [alert.kind for alert in first if alert.kind == 'move'] == ['move']
+    assert not any(alert.kind == 'move' for alert in second)
+
+
+def test_notifier_requires_mailgun_settings(monkeypatch):
+    monkeypatch.setattr(price_alerts, 'get_settings', lambda: Settings(openai_api_key='unused'))
+    with pytest.raises(ValueError, match='MAILGUN_API_KEY'):
+        MailgunAlertNotifier()
+
+
+def test_notifier_posts_without_openai(monkeypatch):
+    class FakeSession:
+        def __init__(self):
+            self.posts = []
+
+        def post(self, url, **kwargs):
+            self.posts.append((url, kwargs['data']))
+            return type('Response', (), {'status_code': 200, 'text': ''})()
+
+    session = FakeSession()
+    settings = Settings(mailgun_api_key='key', mailgun_domain='example.com',
+                        mailgun_from_email='alerts@example.com', recipient_email=('a@example.com',))
+    monkeypatch.setattr(price_alerts, 'get_settings', lambda: settings)
+    monkeypatch.setattr(price_alerts, 'get_http_session', lambda name: session)
+
+    alert = PriceAlert('move', 67000, 11.6, 10, "BTC moved +11.60%")
+    assert MailgunAlertNotifier()([alert])
+    url, data = session.posts[0]
+    assert url == 'https://api.mailgun.net/v3/example.com/messages'
+    assert data['to'] == ['a@example.com']
+    assert data['subject'] == 'BTC Price Alert - move'
@@ -0,0 +1,39 @@
+import json
+import threading
+import time
+
+import pytest
+
+import profiling
+from profiling import RunProfiler
+
+
+def burn(seconds):
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        sum(range(1000))
+
+
+@pytest.mark.skipif(profiling._thread_cpu_clock(threading.main_thread().ident) is None,
+                    reason="needs per-thread CPU clocks")
+def test_breakdown_is_main_thread_scoped(tmp_path):
+    with RunProfiler('test', output_dir=str(tmp_path)) as profiler:
+        worker = threading.Thread(target=burn, args=(0.4,))
+        worker.start()
+        time.sleep(0.2)
+        burn(0.2)
+        worker.join()
+
+    report = json.loads(next(tmp_path.glob('test-*.json')).read_text())
+    timing = report['timing']
+    assert 0.15 <= timing['main_thread_cpu_seconds'] <= 0.35
+    # The worker's CPU shows up only in the process total
+    assert timing['process_cpu_seconds'] >= timing['main_thread_cpu_seconds'] + 0.3
+    assert timing['idle_seconds'] >= 0.15
+    parts = sum(timing[key] for key in ('main_thread_cpu_seconds', 'network_wait_seconds',
+                                        'idle_seconds', 'other_wait_seconds'))
+    assert parts == pytest.approx(timing['wall_seconds'], rel=0.15)
+
+    locations = [allocation['location'] for allocation in report['memory']['top_allocations']]
+    assert not any(location.startswith(profiling.__file__) for location in locations)
+    assert profiler.samples > 0
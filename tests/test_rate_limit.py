@@ -0,0 +1,47 @@
+import rate_limit
+from rate_limit import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def use_clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(rate_limit.time, 'sleep', clock.sleep)
+    return clock
+
+
+def test_calls_are_spaced_evenly(monkeypatch):
+    clock = use_clock(monkeypatch)
+    limiter = RateLimiter.per_minute(30)
+    times = []
+    for _ in range(4):
+        limiter.wait()
+        times.append(clock.now)
+    assert times == [100.0, 102.0, 104.0, 106.0]
+
+
+def test_burst_then_steady_rate(monkeypatch):
+    clock = use_clock(monkeypatch)
+    limiter = RateLimiter(10, burst=3)
+    times = []
+    for _ in range(5):
+        limiter.wait()
+        times.append(round(clock.now, 6))
+    assert times == [100.0, 100.0, 100.0, 100.1, 100.2]
+
+    # An idle spell refills the bucket, but never beyond burst
+    clock.now += 10
+    start = clock.now
+    for _ in range(4):
+        limiter.wait()
+    assert round(clock.now - start, 6) == 0.1
@@ -0,0 +1,39 @@
+import pytest
+
+from config import Settings
+from records import NewsRecord
+from run_cache import DigestCache, fingerprint, price_bucket
+
+
+def news(*ids):
+    return [NewsRecord(news_id, 1_700_000_000.0 + news_id, f"story {news_id}") for news_id in ids]
+
+
+def test_prices_within_tolerance_share_a_bucket():
+    assert price_bucket(100_000, 0.5) == price_bucket(100_100, 0.5)
+    assert price_bucket(100_000, 0.5) != price_bucket(101_000, 0.5)
+    assert price_bucket(None, 0.5) == 0
+
+
+def test_same_ids_and_bucket_match_in_any_order():
+    assert fingerprint(news(1, 2, 3), 100_000, 0.5) == fingerprint(news(3, 1, 2), 100_100, 0.5)
+
+
+def test_new_id_or_price_move_changes_the_fingerprint():
+    base = fingerprint(news(1, 2, 3), 100_000, 0.5)
+    assert fingerprint(news(1, 2, 3, 4), 100_000, 0.5) != base
+    assert fingerprint(news(1, 2, 3), 101_000, 0.5) != base
+
+
+def test_cache_returns_content_only_for_its_fingerprint(tmp_path):
+    cache = DigestCache(str(tmp_path / 'digest.json'))
+    assert cache.lookup('abc') is None
+    cache.store('abc', 'Subject: BTC\nbody')
+    assert cache.lookup('abc') == 'Subject: BTC\nbody'
+    assert cache.lookup('def') is None
+
+
+def test_unknown_cache_mode_is_rejected():
+    assert Settings(digest_cache_mode='reuse').digest_cache_mode == 'reuse'
+    with pytest.raises(ValueError, match='DIGEST_CACHE_MODE'):
+        Settings(digest_cache_mode='skipp')
@@ -0,0 +1,87 @@
+import re
+
+import pytest
+
+from supabase_reader import iter_rows
+
+KEYSET = re.compile(r'timestamp\.gt\."([^"]*)",and\(timestamp\.eq\."([^"]*)",id\.gt\."([^"]*)"\)')
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+        self.filters = []
+        self.row_limit = None
+
+    def select(self, columns):
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row[column] >= value)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda row: row[column] < value)
+        return self
+
+    def or_(self, expression):
+        after, same, last_id = KEYSET.fullmatch(expression).groups()
+        self.filters.append(lambda row: row['timestamp'] > after
+                            or (row['timestamp'] == same and row['id'] > int(last_id)))
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def execute(self):
+        self.client.requests += 1
+        rows = [row for row in self.client.rows if all(f(row) for f in self.filters)]
+        # PostgREST silently truncates responses at max-rows
+        return FakeResponse(rows[:min(self.row_limit, self.client.max_rows)])
+
+
+class FakeClient:
+    def __init__(self, rows, max_rows=1000):
+        self.rows = sorted(rows, key=lambda row: (row['timestamp'], row['id']))
+        self.max_rows = max_rows
+        self.requests = 0
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+def make_rows(count):
+    # Several rows share each timestamp so the id tiebreak is exercised
+    return [{'id': i, 'timestamp': f"2024-01-01T{i // 3 // 60:02d}:{i // 3 % 60:02d}:00"} for i in range(count)]
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_page_size_above_server_cap_reads_every_row(prefetch):
+    client = FakeClient(make_rows(3000), max_rows=1000)
+    rows = list(iter_rows(client, 'btc_price', page_size=5000, prefetch=prefetch))
+    assert [row['id'] for row in rows] == list(range(3000))
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_scan_ends_on_empty_page(prefetch):
+    client = FakeClient(make_rows(250))
+    rows = list(iter_rows(client, 'btc_price', page_size=100, prefetch=prefetch))
+    assert len(rows) == 250
+    # Three data pages and the empty one that ends the scan
+    assert client.requests == 4
+
+
+def test_start_and_end_bound_the_scan():
+    client = FakeClient(make_rows(300))
+    rows = list(iter_rows(client, 'btc_price', page_size=40,
+                          start='2024-01-01T00:10:00', end='2024-01-01T00:20:00'))
+    assert [row['id'] for row in rows] == list(range(30, 60))
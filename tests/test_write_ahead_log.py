@@ -0,0 +1,172 @@
+import time
+
+from write_ahead_log import WriteAheadLog
+
+
+class FakeAPIError(Exception):
+    def __init__(self, code, message='rejected'):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeUpsert:
+    def __init__(self, client, table, payloads, on_conflict, ignore_duplicates):
+        self.client = client
+        self.table = table
+        self.payloads = payloads
+        assert on_conflict == 'idempotency_key' and ignore_duplicates
+
+    def execute(self):
+        self.client.calls.append([payload['idempotency_key'] for payload in self.payloads])
+        if self.client.delay:
+            time.sleep(self.client.delay)
+        if self.client.outage:
+            raise self.client.outage
+        for payload in self.payloads:
+            if payload.get('price') in self.client.rejected_prices:
+                raise FakeAPIError('22P02', 'invalid input syntax for type numeric')
+        stored = self.client.tables.setdefault(self.table, {})
+        for payload in self.payloads:
+            # ignore_duplicates keeps the first copy of each idempotency key
+            stored.setdefault(payload['idempotency_key'], payload)
+        if self.client.lose_acks:
+            self.client.lose_acks -= 1
+            raise ConnectionError('connection reset after commit')
+
+
+class FakeTable:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def upsert(self, payloads, on_conflict=None, ignore_duplicates=False):
+        return FakeUpsert(self.client, self.name, payloads, on_conflict, ignore_duplicates)
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.tables = {}
+        self.calls = []
+        self.outage = None
+        self.lose_acks = 0
+        self.rejected_prices = {'bad'}
+        self.delay = 0.0
+
+    def table(self, name):
+        return FakeTable(self, name)
+
+
+def make_wal(tmp_path, client, **kwargs):
+    return WriteAheadLog(client, path=str(tmp_path / 'wal.sqlite3'), **kwargs)
+
+
+def test_retry_after_lost_ack_does_not_duplicate(tmp_path):
+    client = FakeSupabase()
+    wal = make_wal(tmp_path, client)
+    keys = [wal.append('btc_price', {'price': 100 + i}) for i in range(3)]
+
+    # Supabase stored the batch but the response never arrived
+    client.lose_acks = 1
+    try:
+        wal.flush()
+    except ConnectionError:
+        pass
+    assert wal.pending_count() == 3
+
+    assert wal.flush() == 3
+    assert wal.pending_count() == 0
+    assert sorted(client.tables['btc_price']) == sorted(keys)
+    assert len(client.calls) == 2
+
+
+def test_failing_batch_is_split_and_bad_row_dead_lettered(tmp_path):
+    client = FakeSupabase()
+    wal = make_wal(tmp_path, client, max_batch_attempts=2)
+    good = wal.append('btc_price', {'price': 100})
+    bad = wal.append('btc_price', {'price': 'bad'})
+    after = wal.append('btc_price', {'price': 101})
+
+    # The first failure is retried as a whole batch
+    try:
+        wal.flush()
+    except FakeAPIError:
+        pass
+    assert wal.pending_count() == 3
+
+    # Once the batch reaches max_batch_attempts its rows are retried one at a time
+    assert wal.flush() == 3
+    assert client.calls[-3:] == [[good], [bad], [after]]
+    assert sorted(client.tables['btc_price']) == sorted([good, after])
+    assert wal.pending_count() == 0
+    assert wal.dead_letter_count() == 1
+
+
+def test_config_errors_stay_queued(tmp_path):
+    client = FakeSupabase()
+    wal = make_wal(tmp_path, client, max_batch_attempts=1)
+    wal.append('btc_price', {'price': 100})
+
+    # A missing ON CONFLICT target (migration 001 not applied) is not the row's fault
+    client.outage = FakeAPIError('42P10')
+    for _ in range(3):
+        try:
+            wal.flush()
+        except FakeAPIError:
+            pass
+    assert wal.pending_count() == 1
+    assert wal.dead_letter_count() == 0
+
+
+def test_requeue_dead_letters(tmp_path):
+    client = FakeSupabase()
+    wal = make_wal(tmp_path, client, max_batch_attempts=1)
+    bad = wal.append('btc_price', {'price': 'bad'})
+    assert wal.flush() == 1
+    assert wal.dead_letter_count() == 1
+
+    assert wal.requeue_dead_letters() == 1
+    assert wal.dead_letter_count() == 0
+    assert wal.pending_count() == 1
+
+    # Once the cause is fixed the requeued row is delivered
+    client.rejected_prices = set()
+    assert wal.flush() == 1
+    assert list(client.tables['btc_price']) == [bad]
+
+
+def test_rows_survive_close_during_outage(tmp_path):
+    client = FakeSupabase()
+    client.outage = ConnectionError('supabase unreachable')
+    wal = make_wal(tmp_path, client, flush_interval=0.05).start()
+    keys = [wal.append('btc_price', {'price': 100 + i}) for i in range(2)]
+    wal.wakeup.set()
+    deadline = time.monotonic() + 2
+    while wal.backoff == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert wal.backoff > 0
+
+    # Closing while backing off skips the drain instead of waiting out the outage
+    started = time.monotonic()
+    wal.close(timeout=5)
+    assert time.monotonic() - started < 1
+
+    client.outage = None
+    reopened = make_wal(tmp_path, client)
+    assert reopened.pending_count() == 2
+    assert reopened.flush() == 2
+    assert sorted(client.tables['btc_price']) == sorted(keys)
+    reopened.close()
+
+
+def test_close_does_not_wait_for_a_hung_flush(tmp_path):
+    client = FakeSupabase()
+    client.delay = 1.0
+    wal = make_wal(tmp_path, client).start()
+    wal.append('btc_price', {'price': 100})
+    wal.wakeup.set()
+    while not client.calls:
+        time.sleep(0.01)
+
+    started = time.monotonic()
+    wal.close(timeout=0.2)
+    assert time.monotonic() - started < 0.5
@@ -0,0 +1,229 @@
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+
+class WriteAheadLog:
+    """Local SQLite-backed buffer for Supabase inserts.
+
+    append() commits the row to a local SQLite database in WAL mode and returns
+    immediately. A background flusher ships pending rows to Supabase in batches
+    with retries. Every row carries an idempotency_key, and batches are upserted
+    with ignore-duplicates on that key, so a row that was delivered but not yet
+    removed locally is never inserted twice (see migrations/001_idempotency_keys.sql).
+
+    A batch that keeps failing is retried row by row once its rows reach
+    max_batch_attempts, and rows Supabase rejects on their own are moved to the
+    local dead_letter table so they no longer block the rows queued behind them.
+    """
+
+    def __init__(self,
+                 supabase,
+                 path: str = '.supabase_wal.sqlite3',
+                 batch_size: int = 500,
+                 flush_interval: float = 2.0,
+                 max_backoff: float = 300.0,
+                 max_batch_attempts: int = 5):
+        self.supabase = supabase
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.max_batch_attempts = max_batch_attempts
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        # WAL journaling with synchronous=NORMAL only fsyncs at checkpoints, so appends stay cheap
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pending (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                target_table TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS dead_letter (
+                seq INTEGER PRIMARY KEY,
+                idempotency_key TEXT NOT NULL,
+                target_table TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                error TEXT,
+                failed_at REAL NOT NULL
+            )
+        """)
+
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.backoff = 0.0
+
+    def append(self, table: str, row: dict) -> str:
+        """Durably queue a row for insertion into table; returns its idempotency key"""
+        key = row.get('idempotency_key') or str(uuid.uuid4())
+        payload = dict(row, idempotency_key=key)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO pending (idempotency_key, target_table, payload) VALUES (?, ?, ?)",
+                (key, table, json.dumps(payload))
+            )
+        # The flusher picks rows up on its next tick, so bursts go out as one batch
+        return key
+
+    def pending_count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def dead_letter_count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+
+    def requeue_dead_letters(self) -> int:
+        """Move dead-lettered rows back to pending (e.g. after fixing the schema); returns the count"""
+        with self.lock:
+            self.conn.execute("BEGIN")
+            moved = self.conn.execute("""
+                INSERT OR IGNORE INTO pending (seq, idempotency_key, target_table, payload)
+                SELECT seq, idempotency_key, target_table, payload FROM dead_letter
+            """).rowcount
+            self.conn.execute("DELETE FROM dead_letter")
+            self.conn.execute("COMMIT")
+        return moved
+
+    @staticmethod
+    def _is_rejection(error: Exception) -> bool:
+        """True when Supabase refused the row itself rather than being unavailable or misconfigured.
+
+        PostgREST reports the PostgreSQL SQLSTATE or its own PGRST code. Data exceptions (22),
+        constraint violations (23) and unknown columns (42703, PGRST204) fail again on every
+        retry of the same row. Other errors, such as missing privileges (42501) or a missing
+        conflict target because migration 001 was not applied (42P10), stay queued until fixed.
+        """
+        code = getattr(error, 'code', None)
+        return isinstance(code, str) and (code.startswith(('22', '23')) or code in ('42703', 'PGRST204'))
+
+    def _upsert(self, table: str, payloads: list):
+        self.supabase.table(table) \
+            .upsert(payloads, on_conflict='idempotency_key', ignore_duplicates=True) \
+            .execute()
+
+    def _delete(self, seqs: list):
+        with self.lock:
+            self.conn.executemany("DELETE FROM pending WHERE seq = ?", [(seq,) for seq in seqs])
+
+    def _dead_letter(self, seq: int, error: Exception):
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.execute("""
+                INSERT OR REPLACE INTO dead_letter (seq, idempotency_key, target_table, payload, attempts, error, failed_at)
+                SELECT seq, idempotency_key, target_table, payload, attempts, ?, ? FROM pending WHERE seq = ?
+            """, (f"{type(error).__name__} - {str(error)}", time.time(), seq))
+            self.conn.execute("DELETE FROM pending WHERE seq = ?", (seq,))
+            self.conn.execute("COMMIT")
+
+    def _flush_rows(self, table: str, entries: list) -> int:
+        """Retry a failing batch one row at a time, dead-lettering rows Supabase rejects"""
+        processed = 0
+        for seq, payload, _ in entries:
+            try:
+                self._upsert(table, [payload])
+            except Exception as e:
+                if not self._is_rejection(e):
+                    # Supabase itself is failing; keep the rest queued and back off
+                    raise
+                print(f"Moving {table} row {payload['idempotency_key']} to the dead-letter table: "
+                      f"{type(e).__name__} - {str(e)}")
+                self._dead_letter(seq, e)
+            else:
+                self._delete([seq])
+            processed += 1
+        return processed
+
+    def flush(self) -> int:
+        """Ship one batch of pending rows to Supabase; returns the number of rows taken off the queue"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT seq, target_table, payload, attempts FROM pending ORDER BY seq LIMIT ?",
+                (self.batch_size,)
+            ).fetchall()
+        if not rows:
+            return 0
+
+        by_table = {}
+        for seq, table, payload, attempts in rows:
+            by_table.setdefault(table, []).append((seq, json.loads(payload), attempts + 1))
+
+        processed = 0
+        for table, entries in by_table.items():
+            seqs = [seq for seq, _, _ in entries]
+            try:
+                self._upsert(table, [payload for _, payload, _ in entries])
+            except Exception as e:
+                print(f"Supabase flush error for {table} ({len(entries)} rows): {type(e).__name__} - {str(e)}")
+                with self.lock:
+                    self.conn.executemany("UPDATE pending SET attempts = attempts + 1 WHERE seq = ?",
+                                          [(seq,) for seq in seqs])
+                if max(attempts for _, _, attempts in entries) < self.max_batch_attempts:
+                    raise
+                # The batch has failed repeatedly; find the rows that cannot be delivered
+                processed += self._flush_rows(table, entries)
+                continue
+            self._delete(seqs)
+            processed += len(entries)
+        return processed
+
+    def _run(self):
+        while not self.stopping.is_set():
+            self.wakeup.clear()
+            try:
+                while self.flush() == self.batch_size:
+                    pass
+                self.backoff = 0.0
+                timeout = self.flush_interval
+            except Exception:
+                # Exponential backoff while Supabase is unavailable; rows stay queued locally
+                self.backoff = min(max(self.backoff * 2, self.flush_interval), self.max_backoff)
+                timeout = self.backoff
+            self.wakeup.wait(timeout)
+
+    def start(self):
+        """Start the background flusher thread"""
+        if self.thread is None or not self.thread.is_alive():
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._run, name='supabase-wal-flusher', daemon=True)
+            self.thread.start()
+        return self
+
+    def close(self, timeout: float = 10.0):
+        """Stop the flusher, trying to drain pending rows for up to timeout seconds.
+
+        The drain is skipped while the flusher is backing off, since Supabase was just
+        unreachable; queued rows are kept for the next run either way.
+        """
+        deadline = time.monotonic() + timeout
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout)
+            if not self.thread.is_alive():
+                self.thread = None
+
+        # A flusher still stuck in a request after the join keeps the queue to itself
+        while self.thread is None and self.backoff == 0 and time.monotonic() < deadline:
+            try:
+                if self.flush() == 0:
+                    break
+            except Exception:
+                break
+
+        remaining = self.pending_count()
+        if remaining:
+            print(f"{remaining} rows remain in the local write-ahead log and will be sent on the next run")
+        with self.lock:
+            self.conn.close()